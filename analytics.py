@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class PriceTrends:
+    """Per-ASIN $/oz statistics over the full price history, computed with NumPy
+
+    The history is loaded once into columnar arrays sorted by (ASIN, time);
+    every statistic is then a vectorized reduction over the ASIN groups.
+    Compacted records count as observation_count observations.
+    """
+    def __init__(self, records, window=5):
+        records = list(records)
+        self.window = window  # records in the rolling average
+        self.index = {}
+        self.count = 0
+        if not records:
+            return
+
+        self.asins, codes = np.unique(np.array([r.asin for r in records], dtype=str), return_inverse=True)
+        times = np.array([r.timestamp for r in records], dtype='datetime64[us]')
+        ppo = np.array([r.price_per_oz for r in records], dtype=np.float64)
+        counts = np.array([r.count for r in records], dtype=np.float64)
+
+        # Drop rows without a usable price
+        valid = ~np.isnan(ppo)
+        codes, times, ppo, counts = codes[valid], times[valid], ppo[valid], counts[valid]
+
+        # Time order within each ASIN
+        order = np.lexsort((times, codes))
+        codes, times, ppo, counts = codes[order], times[order], ppo[order], counts[order]
+        if not len(codes):
+            return
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)] - 1
+        group_codes = codes[starts]
+        self.index = {asin: i for i, asin in enumerate(self.asins[group_codes])}
+        self.count = len(starts)
+
+        self.observations = np.add.reduceat(counts, starts)
+        self.min = np.minimum.reduceat(ppo, starts)
+        self.max = np.maximum.reduceat(ppo, starts)
+        self.latest = ppo[ends]
+        self.latest_time = times[ends]
+
+        # Time of the all-time low (first time it was reached)
+        group_of = np.repeat(np.arange(len(starts)), ends - starts + 1)
+        at_min = np.flatnonzero(ppo == self.min[group_of])
+        first_at_min = at_min[np.r_[True, group_of[at_min][1:] != group_of[at_min][:-1]]]
+        self.min_time = times[first_at_min]
+
+        # Rolling average of the last `window` records, weighted by observation count
+        weighted = np.cumsum(ppo * counts)
+        cum_counts = np.cumsum(counts)
+        window_start = np.maximum(ends - window + 1, starts)
+        before = window_start - 1
+        prior_weighted = np.where(before >= 0, weighted[np.maximum(before, 0)], 0.0)
+        prior_counts = np.where(before >= 0, cum_counts[np.maximum(before, 0)], 0.0)
+        self.rolling_avg = (weighted[ends] - prior_weighted) / (cum_counts[ends] - prior_counts)
+
+        # Last price change: latest $/oz minus the $/oz before the most recent change
+        changed = np.r_[False, (ppo[1:] != ppo[:-1]) & (codes[1:] == codes[:-1])]
+        change_positions = np.where(changed, np.arange(len(ppo)), -1)
+        last_change = np.maximum.reduceat(change_positions, starts)
+        has_change = last_change >= 0
+        self.last_change = np.where(has_change, ppo[ends] - ppo[np.maximum(last_change - 1, 0)], 0.0)
+        self.last_change_time = np.where(has_change, times[np.maximum(last_change, 0)], np.datetime64('NaT'))
+
+        # Weighted median and percentile rank need each group sorted by price
+        by_price = np.lexsort((ppo, codes))
+        self._sorted_codes = codes[by_price]
+        self._sorted_ppo = ppo[by_price]
+        self._sorted_cum = np.cumsum(counts[by_price])
+        self._group_base = np.r_[0.0, self._sorted_cum[ends[:-1]]]
+        half = self._group_base + self.observations / 2
+        self.median = self._sorted_ppo[np.searchsorted(self._sorted_cum, half, side='left')]
+        self._group_codes = group_codes
+
+    def percentile_rank(self, asins, prices):
+        """% of each ASIN's past observations strictly cheaper than the given $/oz
+
+        0 means the price is at (or ties) the all-time low.
+        """
+        groups = np.array([self.index.get(asin, -1) for asin in asins])
+        prices = np.asarray(prices, dtype=np.float64)
+        ranks = np.full(len(groups), np.nan)
+        known = groups >= 0
+        if not known.any():
+            return ranks
+
+        g = groups[known]
+        # Composite key keeps the (ASIN, price) sort order searchable in one array
+        scale = float(self._sorted_ppo.max()) + 1.0
+        keys = self._sorted_codes + self._sorted_ppo / scale
+        query = self._group_codes[g] + np.minimum(prices[known] / scale, np.nextafter(1.0, 0.0))
+        position = np.searchsorted(keys, query, side='left')
+        cheaper = np.where(position > 0, self._sorted_cum[np.maximum(position - 1, 0)], 0.0) - self._group_base[g]
+        ranks[known] = 100 * np.maximum(cheaper, 0.0) / self.observations[g]
+        return ranks
+
+    def stats(self, asin):
+        """Summary dict for one ASIN, or None if it has no history"""
+        i = self.index.get(asin)
+        if i is None:
+            return None
+        return {
+            'observations': int(self.observations[i]),
+            'min': float(self.min[i]),
+            'min_time': str(self.min_time[i]),
+            'max': float(self.max[i]),
+            'median': float(self.median[i]),
+            'rolling_avg': float(self.rolling_avg[i]),
+            'latest': float(self.latest[i]),
+            'last_change': float(self.last_change[i]),
+        }
+
+    def describe(self, asin, price_per_oz):
+        """One-line markdown annotation of how a price compares to history"""
+        stats = self.stats(asin)
+        if stats is None:
+            return None
+        return describe_price(stats, self.percentile_rank([asin], [price_per_oz])[0], price_per_oz)
+
+
+def describe_price(stats, rank, price_per_oz):
+    """Annotate a $/oz price given an ASIN's history stats and its percentile rank"""
+    if stats['observations'] < 2:
+        return None
+    if price_per_oz <= stats['min']:
+        verdict = "📉 all-time low"
+    elif rank <= 10:
+        verdict = f"near all-time low (only {rank:.0f}% of past observations were cheaper)"
+    else:
+        verdict = f"percentile {rank:.0f} of past prices"
+    change = ""
+    if stats['last_change']:
+        change = f", last change {stats['last_change']:+.4f}"
+    return (f"{verdict} - min ${stats['min']:.4f}, median ${stats['median']:.4f}, "
+            f"max ${stats['max']:.4f}, recent avg ${stats['rolling_avg']:.4f}{change} "
+            f"({stats['observations']} observations)")
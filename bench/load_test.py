@@ -0,0 +1,140 @@
+"""End-to-end load test of the fetch pipeline against a local stand-in server
+
+    python bench/load_test.py [--products 60] [--latency 150] [--error-rate 0.05]
+                              [--captcha-rate 0.02] [--workers 4] [--rate 20]
+                              [--output load_results.json] [--url http://127.0.0.1:8000]
+
+Starts bench/server.py in-process (or uses --url), points an AmazonAdapter at
+it and runs a real search + product check through the tracker: rate limiting,
+retries, AIMD concurrency, the circuit breaker, parse workers and captures
+all included. Reports products/minute and how injected errors were recovered.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from retailers import AmazonAdapter  # noqa: E402
+from server import add_server_arguments, retailer_from_args, start_server  # noqa: E402
+from run_bench import git_commit  # noqa: E402
+import tracker as tracker_module  # noqa: E402
+
+
+def run_load(tracker, adapter, search_pages, prescreen=False):
+    """Search, then check every discovered product; returns (results, seconds per stage)"""
+    catalog = tracker.catalogs[adapter.key]
+    catalog.start_run()
+    timings = {}
+    tracker.start_parse_pool()
+    try:
+        start = time.perf_counter()
+        found = tracker.search(adapter, max_pages=search_pages)
+        timings['search_s'] = time.perf_counter() - start
+        catalog.add_discovered(found, tracker.search_cards[adapter.key])
+        asins = tracker.prescreen(adapter, found) if prescreen else found
+
+        start = time.perf_counter()
+        results = tracker.check_products(adapter, asins, limit=len(asins), debug_first=0)
+        timings['products_s'] = time.perf_counter() - start
+    finally:
+        tracker.stop_parse_pool()
+    return results, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test against a local stand-in retailer')
+    parser.add_argument('--url', help='use an already running bench/server.py instead of starting one')
+    add_server_arguments(parser)
+    parser.add_argument('--workers', type=int, default=4, help='pages in flight (adapter max_workers)')
+    parser.add_argument('--rate', type=float, default=20.0, help='requests per second')
+    parser.add_argument('--burst', type=int, default=4)
+    parser.add_argument('--jitter', type=float, default=0.0, help='random extra delay per request (seconds)')
+    parser.add_argument('--backoff', type=float, default=0.25, help='first retry delay (seconds)')
+    parser.add_argument('--retries', type=int, default=2)
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--prescreen', action='store_true', help='skip products ruled out by their search card')
+    parser.add_argument('--output', default='load_results.json')
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+
+    if args.url:
+        base_url = args.url.rstrip('/')
+        server = None
+    else:
+        print(f'🧪 Rendering {args.products} synthetic products...')
+        server, base_url = start_server(retailer_from_args(args))
+    search_pages = math.ceil(args.products / args.per_page)
+
+    adapter = AmazonAdapter(base_url=base_url)
+    adapter.max_workers = args.workers
+    adapter.requests_per_second = args.rate
+    adapter.request_burst = args.burst
+    adapter.request_jitter = args.jitter
+
+    # Fresh caches every run, kept out of the working tree
+    workdir = tempfile.mkdtemp(prefix='tracker-load-')
+    os.chdir(workdir)
+    tracker = tracker_module.MonsterDealTracker(history_file=os.path.join(workdir, 'history.json'), retailers=[adapter])
+    tracker.parse_workers = args.parse_workers
+    fetcher = tracker.fetchers[adapter.key]
+    fetcher.backoff = args.backoff
+    fetcher.retries = args.retries
+
+    print(f'🚚 Checking {base_url} with {args.workers} workers at {args.rate:g} requests/s...')
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results, timings = run_load(tracker, adapter, search_pages, args.prescreen)
+    wall = time.perf_counter() - start
+
+    metrics = tracker.metrics.to_dict()
+    counters = metrics['counters']
+    checked = counters.get('products_checked', 0)
+    served = requests.get(f'{base_url}/__stats', timeout=10).json()
+    if server is not None:
+        server.shutdown()
+
+    current = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'wall_s': round(wall, 3),
+        'search_s': round(timings['search_s'], 3),
+        'products_s': round(timings['products_s'], 3),
+        'products_checked': checked,
+        'valid_products': len(results),
+        'products_per_min': round(checked / timings['products_s'] * 60, 1) if timings['products_s'] else None,
+        'requests': counters.get('requests', 0),
+        'retries': counters.get('retries', 0),
+        'throttled': metrics.get('throttled', {}),
+        'products_blocked': counters.get('products_blocked', 0),
+        'status': fetcher.breaker.describe() if fetcher.breaker.open else 'ok',
+        'server': served,
+    }
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+
+    injected = served['errors_503'] + served['captchas'] + served['outage_503']
+    print(f"\n⏱️  {current['wall_s']}s total: search {current['search_s']}s, products {current['products_s']}s")
+    print(f"📦 {checked} products checked, {len(results)} valid - {current['products_per_min']} products/min")
+    print(f"🌐 {served['requests']} requests served, {served['bytes_sent'] / 1024 / 1024:.1f} MB sent")
+    print(f"🧯 {injected} injected failures ({served['errors_503']} 503s, {served['captchas']} robot checks, "
+          f"{served['outage_503']} during outage), {current['retries']} retries, "
+          f"{current['products_blocked']} products given up on")
+    print(f"🚦 Status: {current['status']}")
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Generate the offline benchmark corpus in bench/fixtures/
+
+    python bench/make_fixtures.py [--products 24] [--search-pages 3] [--seed 7]
+
+Pages are deterministic for a given seed, so the corpus only needs
+regenerating when synthetic.py changes.
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+
+from synthetic import make_product, product_page, search_page
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def write_page(directory, name, html):
+    with gzip.open(os.path.join(directory, name), 'wt', encoding='utf-8', compresslevel=9) as f:
+        f.write(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate benchmark HTML fixtures')
+    parser.add_argument('--products', type=int, default=24)
+    parser.add_argument('--search-pages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', default=FIXTURE_DIR)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    products = [make_product(rng) for _ in range(args.products)]
+    manifest = {'seed': args.seed, 'search': [], 'products': []}
+
+    per_page = -(-len(products) // args.search_pages)
+    for page in range(1, args.search_pages + 1):
+        name = f'search_{page}.html.gz'
+        write_page(args.output, name, search_page(products[(page - 1) * per_page:page * per_page], rng))
+        manifest['search'].append({'page': page, 'file': name})
+
+    for product in products:
+        name = f'product_{product["asin"]}.html.gz'
+        write_page(args.output, name, product_page(product, rng))
+        manifest['products'].append(dict(product, file=name))
+
+    with open(os.path.join(args.output, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f'💾 Wrote {len(products)} product and {args.search_pages} search pages to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
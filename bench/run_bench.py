@@ -0,0 +1,230 @@
+"""Offline replay benchmarks for the tracker's parsing and reporting stages
+
+    python bench/run_bench.py [--iterations 20] [--output bench_results.json]
+                              [--compare previous.json] [--corpus .tracker_cache/captures]
+
+Pages come from bench/fixtures (see make_fixtures.py) and are served by a
+replay fetcher, so no network access is needed. Extra real pages can be added
+with --corpus: either a capture store (the latest successful capture of each
+product is used) or a directory of product pages named after their ASIN.
+"""
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fetcher import CircuitBreaker, Page  # noqa: E402
+from captures import CaptureStore  # noqa: E402
+from extraction import parse_html  # noqa: E402
+import tracker as tracker_module  # noqa: E402
+
+SEARCH_URL = 'https://www.amazon.com/s?k=monster+energy+drink&page={page}'
+PRODUCT_URL = 'https://www.amazon.com/dp/{asin}'
+
+
+class ReplayFetcher:
+    """Stands in for Fetcher, serving recorded pages by URL"""
+    def __init__(self, pages):
+        self.pages = pages
+        self.cache = None
+        self.breaker = CircuitBreaker()
+
+    def get(self, url, max_age=None):
+        content = self.pages.get(url)
+        if content is None:
+            return Page(url, 404, b'')
+        return Page(url, 200, content, {'Content-Type': 'text/html; charset=utf-8'})
+
+    def map(self, func, items):
+        for item in items:
+            yield func(item)
+
+    def close(self):
+        pass
+
+
+def read_page(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return f.read()
+
+
+def load_corpus(fixture_dir, extra_dirs=()):
+    """Return (search pages, {asin: product page}, {asin: title}) from the fixtures"""
+    with open(os.path.join(fixture_dir, 'manifest.json'), 'r') as f:
+        manifest = json.load(f)
+
+    search_pages = [read_page(os.path.join(fixture_dir, entry['file'])) for entry in manifest['search']]
+    product_pages = {}
+    titles = {}
+    for entry in manifest['products']:
+        product_pages[entry['asin']] = read_page(os.path.join(fixture_dir, entry['file']))
+        titles[entry['asin']] = entry['title']
+
+    for directory in extra_dirs:
+        if os.path.exists(os.path.join(directory, 'index.jsonl')):
+            store = CaptureStore(directory)
+            for asin, entry in store.latest().items():
+                if entry['status'] == 200:
+                    product_pages[asin] = store.read(entry['hash'])
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.html', '.html.gz')):
+                asin = name.split('.')[0]
+                product_pages[asin] = read_page(os.path.join(directory, name))
+    return search_pages, product_pages, titles
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, pages):
+    """Latencies are per page, in seconds"""
+    total = sum(latencies)
+    return {
+        'pages': pages,
+        'pages_per_sec': round(pages / total, 2) if total else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'total_s': round(total, 4),
+        # ru_maxrss is KB on Linux and never goes down, so this is the peak so far
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_search(tracker, search_pages, iterations):
+    """Amazon search card extraction, one page per call"""
+    adapter = tracker.retailers[0]
+    latencies = []
+    for _ in range(iterations):
+        for content in search_pages:
+            tracker.fetchers[adapter.key] = ReplayFetcher({SEARCH_URL.format(page=1): content})
+            tracker.search_cards[adapter.key].clear()
+            latencies.append(timed(tracker.search, adapter, 1)[0])
+    return summarize(latencies, len(latencies))
+
+
+def bench_product(tracker, product_pages, iterations):
+    """check_product parsing and extraction, pack-size cache cold"""
+    adapter = tracker.retailers[0]
+    tracker.fetchers[adapter.key] = ReplayFetcher({PRODUCT_URL.format(asin=asin): content for asin, content in product_pages.items()})
+    latencies = []
+    results = []
+    for _ in range(iterations):
+        for asin in product_pages:
+            tracker.pack_sizes[adapter.key].entries.clear()
+            elapsed, result = timed(tracker.check_product, adapter, asin)
+            latencies.append(elapsed)
+            if result:
+                results.append(result)
+    return summarize(latencies, len(latencies)), results
+
+
+def bench_fluid_oz(tracker, product_pages, titles, iterations):
+    """extract_fluid_oz_advanced over title + detail blocks of parsed pages"""
+    docs = [(titles.get(asin, ''), parse_html(content)) for asin, content in product_pages.items()]
+    latencies = []
+    for _ in range(iterations):
+        for title, doc in docs:
+            latencies.append(timed(tracker.extract_fluid_oz_advanced, title, doc)[0])
+    return summarize(latencies, len(latencies))
+
+
+def bench_report(tracker, results, iterations):
+    """generate_report over a run's worth of results"""
+    tracker.results = results
+    latencies = [timed(tracker.generate_report)[0] for _ in range(iterations)]
+    return summarize(latencies, len(latencies))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous_path):
+    with open(previous_path, 'r') as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous.get('commit') or previous_path}:")
+    for name, stats in current['benchmarks'].items():
+        old = previous.get('benchmarks', {}).get(name)
+        if not old or not old.get('pages_per_sec') or not stats.get('pages_per_sec'):
+            continue
+        speedup = stats['pages_per_sec'] / old['pages_per_sec']
+        print(f"  {name:<10} {old['pages_per_sec']:>10.1f} -> {stats['pages_per_sec']:>10.1f} pages/s  ({speedup:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline tracker benchmarks')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--fixtures', default=os.path.join(BENCH_DIR, 'fixtures'))
+    parser.add_argument('--corpus', action='append', default=[], help='extra directory of captured product pages')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    args = parser.parse_args()
+
+    search_pages, product_pages, titles = load_corpus(args.fixtures, args.corpus)
+    output = os.path.abspath(args.output)
+
+    # Keep the tracker's on-disk caches out of the working tree
+    workdir = tempfile.mkdtemp(prefix='tracker-bench-')
+    os.chdir(workdir)
+    tracker = tracker_module.MonsterDealTracker(history_file=os.path.join(workdir, 'history.json'))
+    tracker.captures = None  # time parsing, not archiving
+
+    benchmarks = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        benchmarks['search'] = bench_search(tracker, search_pages, args.iterations)
+        benchmarks['product'], results = bench_product(tracker, product_pages, args.iterations)
+        benchmarks['fluid_oz'] = bench_fluid_oz(tracker, product_pages, titles, args.iterations)
+        benchmarks['report'] = bench_report(tracker, results[:len(product_pages)], args.iterations)
+
+    current = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'iterations': args.iterations,
+        'corpus': {'search_pages': len(search_pages), 'product_pages': len(product_pages)},
+        'benchmarks': benchmarks,
+    }
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+
+    print(f"{'stage':<10} {'pages/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'peak RSS MB':>12}")
+    for name, stats in benchmarks.items():
+        print(f"{name:<10} {stats['pages_per_sec'] or 0:>10.1f} {stats['p50_ms']:>10.3f} "
+              f"{stats['p95_ms']:>10.3f} {stats['peak_rss_mb']:>12.1f}")
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        compare(current, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Local stand-in retailer server for end-to-end and load testing
+
+    python bench/server.py [--port 8000] [--products 60] [--latency 150]
+                           [--error-rate 0.05] [--captcha-rate 0.02] [--page-kb 40,120,400]
+
+Serves synthetic Amazon-like /s?k=...&page=N search pages and /dp/<asin>
+product pages (see synthetic.py) with configurable latency, injected 503s
+and robot checks, and a spread of page sizes. Point the tracker at it with
+
+    python tracker.py --base-url amazon=http://127.0.0.1:8000
+
+The tracker keeps that run's catalog and pack sizes apart from the real
+retailer's, in .tracker_cache/amazon@127.0.0.1_8000/.
+
+Counters of what was served are available as JSON at /__stats.
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import make_product, product_page, search_page
+
+CAPTCHA_PAGE = b'''<!doctype html>
+<html><head><title>Robot Check</title></head><body>
+<form method="get" action="/errors/validateCaptcha">
+<p>Sorry, we just need to make sure you're not a robot. For best results, please make sure your browser is accepting cookies.</p>
+</form></body></html>'''
+
+
+class StandInRetailer:
+    """Synthetic catalog, pre-rendered pages and the fault model of a stand-in server"""
+    def __init__(self, products=60, per_page=20, seed=7, page_kb=(120,), latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, captcha_rate=0.0, retry_after=None, block_after=None, block_for=0.0):
+        self.latency = latency                # seconds added to every response
+        self.latency_jitter = latency_jitter  # ... plus up to this much at random
+        self.error_rate = error_rate          # share of requests answered with a 503
+        self.captcha_rate = captcha_rate      # share answered with a robot-check page
+        self.retry_after = retry_after        # Retry-After seconds sent with 503s (None: no header)
+        self.block_after = block_after        # requests before an outage starts (None: never)
+        self.block_for = block_for            # outage length in seconds; every request gets a 503
+        self.blocked_until = None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'search': 0, 'product': 0, 'not_found': 0,
+                      'errors_503': 0, 'captchas': 0, 'outage_503': 0, 'bytes_sent': 0}
+
+        # Pages are rendered once up front so serving stays cheap next to the tracker
+        page_rng = random.Random(seed)
+        self.products = [make_product(page_rng) for _ in range(products)]
+        self.product_pages = {}
+        for product in self.products:
+            script_kb = page_rng.choice(page_kb)
+            html = product_page(product, page_rng, filler_blocks=max(script_kb * 3, 40), script_kb=script_kb)
+            self.product_pages[product['asin']] = _encoded(html)
+        self.search_pages = []
+        for start in range(0, len(self.products), per_page):
+            self.search_pages.append(_encoded(search_page(self.products[start:start + per_page], page_rng)))
+        self.empty_search_page = _encoded(search_page([], page_rng))
+
+    def fault(self):
+        """The injected failure for the next request: '503', 'outage', 'captcha' or None"""
+        with self.lock:
+            self.stats['requests'] += 1
+            now = time.monotonic()
+            if self.block_after is not None and self.blocked_until is None and self.stats['requests'] > self.block_after:
+                self.blocked_until = now + self.block_for
+            if self.blocked_until is not None and now < self.blocked_until:
+                return 'outage'
+            roll = self.rng.random()
+            if roll < self.error_rate:
+                return '503'
+            if roll < self.error_rate + self.captcha_rate:
+                return 'captcha'
+            return None
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+        return self.latency + jitter
+
+    def count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def _encoded(html):
+    """(plain bytes, gzip bytes) of a page"""
+    body = html.encode('utf-8')
+    return body, gzip.compress(body, compresslevel=6)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+    retailer = None  # set by make_server
+
+    def do_GET(self):
+        retailer = self.retailer
+        url = urlsplit(self.path)
+        if url.path == '/__stats':
+            self.send_page(200, _encoded(json.dumps(retailer.snapshot())), 'application/json')
+            return
+
+        time.sleep(retailer.delay())
+        fault = retailer.fault()
+        if fault in ('503', 'outage'):
+            retailer.count('errors_503' if fault == '503' else 'outage_503')
+            headers = {'Retry-After': str(retailer.retry_after)} if retailer.retry_after is not None else {}
+            self.send_page(503, _encoded('<html><body>Service Unavailable</body></html>'), headers=headers)
+            return
+        if fault == 'captcha':
+            retailer.count('captchas')
+            self.send_page(200, (CAPTCHA_PAGE, gzip.compress(CAPTCHA_PAGE)))
+            return
+
+        if url.path == '/s':
+            retailer.count('search')
+            page = int(parse_qs(url.query).get('page', ['1'])[0])
+            pages = retailer.search_pages
+            self.send_page(200, pages[page - 1] if 1 <= page <= len(pages) else retailer.empty_search_page)
+        elif url.path.startswith('/dp/') and url.path[4:] in retailer.product_pages:
+            retailer.count('product')
+            self.send_page(200, retailer.product_pages[url.path[4:]])
+        else:
+            retailer.count('not_found')
+            self.send_page(404, _encoded('<html><body>Page Not Found</body></html>'))
+
+    def send_page(self, status, encoded, content_type='text/html; charset=utf-8', headers=None):
+        plain, compressed = encoded
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        body = compressed if use_gzip else plain
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.retailer.count('bytes_sent', len(body))
+
+    def log_message(self, format, *args):
+        pass  # one line per request drowns out the tracker's own output
+
+
+def make_server(retailer, host='127.0.0.1', port=0):
+    """HTTP server for a StandInRetailer; port 0 picks a free port"""
+    handler = type('Handler', (StandInHandler,), {'retailer': retailer})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_server(retailer, host='127.0.0.1', port=0):
+    """Serve in a background thread, returning (server, base URL)"""
+    server = make_server(retailer, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def add_server_arguments(parser):
+    """Catalog and fault-model options, shared with load_test.py"""
+    parser.add_argument('--products', type=int, default=60)
+    parser.add_argument('--per-page', type=int, default=20, help='product cards per search page')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--page-kb', default='120',
+                        help='comma-separated script weights (KB) product pages are drawn from, e.g. 40,120,400')
+    parser.add_argument('--latency', type=float, default=0.0, help='milliseconds added to every response')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='up to this many extra milliseconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help='share answered with a robot-check page')
+    parser.add_argument('--retry-after', type=int, help='Retry-After seconds sent with 503s')
+    parser.add_argument('--block-after', type=int, help='start an outage (all 503s) after this many requests')
+    parser.add_argument('--block-for', type=float, default=60.0, help='outage length in seconds')
+
+
+def retailer_from_args(args):
+    return StandInRetailer(
+        products=args.products,
+        per_page=args.per_page,
+        seed=args.seed,
+        page_kb=tuple(int(kb) for kb in args.page_kb.split(',')),
+        latency=args.latency / 1000,
+        latency_jitter=args.latency_jitter / 1000,
+        error_rate=args.error_rate,
+        captcha_rate=args.captcha_rate,
+        retry_after=args.retry_after,
+        block_after=args.block_after,
+        block_for=args.block_for,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in retailer server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    retailer = retailer_from_args(args)
+    server = make_server(retailer, args.host, args.port)
+    print(f'🧪 Serving {len(retailer.products)} synthetic products on {len(retailer.search_pages)} search pages '
+          f'at http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f'\n📊 {json.dumps(retailer.snapshot())}')
+
+
+if __name__ == '__main__':
+    main()
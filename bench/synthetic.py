@@ -0,0 +1,147 @@
+"""Synthetic Amazon-like search and product pages
+
+The pages mimic the DOM structure the tracker relies on (search result
+cards, rightCol buy box, aod-offer-list, availability, productTitle, detail
+bullets) and pad it with the kind of bulk real pages carry: inline scripts,
+nested a-section layout divs and recommendation carousels.
+"""
+
+FLAVORS = [
+    'Original Green', 'Zero Ultra', 'Lo-Carb', 'Ultra Paradise', 'Ultra Fiesta Mango',
+    'Juice Monster Mango Loco', 'Juice Monster Pipeline Punch', 'Rehab Tea + Lemonade',
+    'Ultra Violet', 'Ultra Blue Hawaiian', 'Java Monster Mean Bean', 'Reserve Watermelon',
+]
+PACK_FORMATS = [
+    '{oz} Ounce (Pack of {count})',
+    '{oz} Fl Oz (Pack of {count})',
+    '{count} Pack, {oz} Fl Oz',
+    'Pack of {count}, {oz} oz',
+    '{count} x {oz} fl oz',
+]
+
+
+def make_asin(rng):
+    return 'B0' + ''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(8))
+
+
+def make_product(rng, asin=None):
+    """Random product description used for both search cards and product pages"""
+    count = rng.choice([4, 6, 12, 15, 24])
+    oz = rng.choice([12, 15.5, 16, 24])
+    oz_text = f'{oz:g}'
+    brand = 'Monster Energy' if rng.random() > 0.1 else 'Bang Energy'
+    title = f"{brand} {rng.choice(FLAVORS)}, Energy Drink, {rng.choice(PACK_FORMATS).format(oz=oz_text, count=count)}"
+    # Mostly $0.07-$0.20 per oz, occasionally a single-can unit price style listing
+    price = round(count * oz * rng.uniform(0.07, 0.20), 2)
+    return {
+        'asin': asin or make_asin(rng),
+        'title': title,
+        'price': price,
+        'fl_oz': count * oz,
+        'availability': rng.choice(['In Stock', 'In Stock', 'In Stock', 'Only 3 left in stock - order soon.',
+                                    'Currently unavailable.', '']),
+    }
+
+
+def _price_spans(price):
+    whole, fraction = f'{price:.2f}'.split('.')
+    return (f'<span class="a-price" data-a-size="xl"><span class="a-offscreen">${price:.2f}</span>'
+            f'<span aria-hidden="true"><span class="a-price-symbol">$</span>'
+            f'<span class="a-price-whole">{int(whole):,}<span class="a-price-decimal">.</span></span>'
+            f'<span class="a-price-fraction">{fraction}</span></span></span>')
+
+
+def _script(rng, size):
+    payload = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789') for _ in range(64))
+    return f'<script type="text/javascript">P.when("A").execute(function(A){{var d="{payload * (size // 64)}";}});</script>'
+
+
+def _layout_filler(rng, blocks, depth=4):
+    """Nested a-section divs with text, like Amazon's centre column"""
+    parts = []
+    for i in range(blocks):
+        inner = f'<span class="a-size-base">Feature text {i} {rng.randint(0, 99999)}</span>'
+        for level in range(rng.randint(1, depth)):
+            inner = f'<div class="a-section a-spacing-small a-spacing-top-{level}">{inner}</div>'
+        parts.append(inner)
+    return ''.join(parts)
+
+
+def _carousel(rng, items):
+    cards = []
+    for _ in range(items):
+        other = make_product(rng)
+        cards.append(
+            f'<li class="a-carousel-card"><div data-asin="{other["asin"]}" class="a-section faceout">'
+            f'<a href="/dp/{other["asin"]}"><span>{other["title"]}</span></a>{_price_spans(other["price"])}</div></li>')
+    return ('<div class="a-section a-carousel-container"><h2>Consider these alternatives</h2>'
+            f'<ol class="a-carousel">{"".join(cards)}</ol></div>')
+
+
+def product_page(product, rng, filler_blocks=400, script_kb=120, offers=None):
+    """Full product detail page for one product"""
+    if offers is None:
+        offers = rng.choice([0, 0, 2, 5])
+    if product['availability']:
+        availability = f'<div id="availability" class="a-section"><span class="a-size-medium a-color-success">{product["availability"]}</span></div>'
+    else:
+        availability = ''
+    offer_list = ''
+    if offers:
+        rows = []
+        for i in range(offers):
+            offer_price = round(product['price'] * rng.uniform(0.9, 1.3), 2)
+            rows.append(
+                f'<div id="aod-offer-{i}" class="a-section">{_price_spans(offer_price)}'
+                f'<div id="aod-offer-soldBy-{i}"><span>Sold by</span><a>Seller {i}</a></div></div>')
+        offer_list = f'<div id="aod-offer-list">{"".join(rows)}</div>'
+    subscribe = '<span>Subscribe &amp; Save</span>' if rng.random() < 0.2 else ''
+    details = ''
+    if rng.random() < 0.7:
+        details = (f'<div id="detailBullets_feature_div"><ul class="a-unordered-list">'
+                   f'<li><span>Package Dimensions : 16 x 11 x 6 inches; 14 Pounds</span></li>'
+                   f'<li><span>Size : {product["title"].split(", ")[-1]}</span></li>'
+                   f'<li><span>ASIN : {product["asin"]}</span></li></ul></div>')
+    scripts = ''.join(_script(rng, 4096) for _ in range(max(script_kb // 4, 1)))
+    return f'''<!doctype html>
+<html lang="en-us"><head><meta charset="utf-8"><title>Amazon.com : {product["title"]}</title>{scripts}</head>
+<body><!-- sp:feature:nav -->
+<div id="a-page"><div id="dp" class="grocery en_US"><div id="dp-container" class="a-container">
+<div id="centerCol" class="centerColAlign">
+<div id="title_feature_div" class="a-section"><h1 id="title"><span id="productTitle" class="a-size-large">        {product["title"]}       </span></h1></div>
+{availability}
+{_layout_filler(rng, filler_blocks // 2)}
+{details}
+</div>
+<div id="rightCol" class="rightCol"><div id="buybox" class="a-section">
+<div id="corePrice_feature_div" class="a-section">{_price_spans(product["price"])}</div>{subscribe}
+<div id="merchant-info" class="a-section">Ships from and sold by Amazon.com</div></div></div>
+{offer_list}
+{_layout_filler(rng, filler_blocks // 2)}
+{_carousel(rng, 12)}
+{_carousel(rng, 12)}
+</div></div></div></body></html>'''
+
+
+def search_card(product, rng):
+    return (f'<div data-asin="{product["asin"]}" data-index="{rng.randint(0, 60)}" data-component-type="s-search-result" '
+            f'class="sg-col-4-of-24 s-result-item s-asin"><div class="sg-col-inner"><div class="a-section a-spacing-base">'
+            f'<div class="s-product-image-container"><img class="s-image" src="https://m.media-amazon.com/images/I/{product["asin"]}.jpg"></div>'
+            f'<div class="a-section a-spacing-small puis-padding-left-small"><h2 class="a-size-mini s-line-clamp-3">'
+            f'<a class="a-link-normal s-link-style a-text-normal" href="/dp/{product["asin"]}">'
+            f'<span class="a-size-base-plus a-color-base a-text-normal">{product["title"]}</span></a></h2>'
+            f'<div class="a-row a-size-base a-color-base"><a class="a-link-normal" href="/dp/{product["asin"]}">'
+            f'{_price_spans(product["price"])}</a>'
+            f'<span class="a-size-base a-color-secondary">(${product["price"] / product["fl_oz"]:.2f}/Fl Oz)</span></div>'
+            f'</div></div></div></div>')
+
+
+def search_page(products, rng, script_kb=80):
+    """Search results page containing one card per product"""
+    cards = ''.join(search_card(product, rng) for product in products)
+    scripts = ''.join(_script(rng, 4096) for _ in range(max(script_kb // 4, 1)))
+    return f'''<!doctype html>
+<html lang="en-us"><head><meta charset="utf-8"><title>Amazon.com : monster energy drink</title>{scripts}</head>
+<body><div id="search"><div class="s-desktop-width-max s-desktop-content">
+<div class="s-main-slot s-result-list s-search-results sg-row">{cards}</div>
+</div></div></body></html>'''
@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+
+class CaptureStore:
+    """Compressed, content-addressed snapshots of fetched pages
+
+    Page bodies are stored once per distinct content as objects/<sha256>.html.gz;
+    index.jsonl gets one line per capture (retailer, kind, asin, url,
+    timestamp, status, hash, sizes), so re-fetching an unchanged page only
+    adds an index line.
+    """
+    def __init__(self, directory, max_bytes=100 * 1024 * 1024, max_age_days=30):
+        self.directory = directory
+        self.max_bytes = max_bytes        # compressed bytes kept by prune()
+        self.max_age_days = max_age_days  # captures older than this are pruned
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.lock = threading.Lock()
+        self.stats = {'captured': 0, 'deduplicated': 0, 'bytes_written': 0}
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f'{digest}.html.gz')
+
+    def add(self, url, status, content, asin=None, retailer=None, kind='product'):
+        """Capture a page body, returning its content hash"""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            stored_size = os.path.getsize(path)
+            deduplicated = True
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = gzip.compress(content, compresslevel=6)
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            stored_size = len(data)
+            deduplicated = False
+
+        entry = {
+            'retailer': retailer,
+            'kind': kind,
+            'asin': asin,
+            'url': url,
+            'timestamp': datetime.now().isoformat(),
+            'status': status,
+            'hash': digest,
+            'size': len(content),
+            'stored_size': stored_size,
+        }
+        with self.lock:
+            with open(self.index_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self.stats['captured'] += 1
+            if deduplicated:
+                self.stats['deduplicated'] += 1
+            else:
+                self.stats['bytes_written'] += stored_size
+        return digest
+
+    def entries(self):
+        """Stream index entries, oldest first"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # partial line from an interrupted run
+
+    def read(self, digest):
+        with gzip.open(self.object_path(digest), 'rb') as f:
+            return f.read()
+
+    def replay(self, asin=None, kind=None):
+        """Stream (entry, content) for matching captures, oldest first
+
+        Bodies are decompressed one at a time, so the whole archive never has
+        to fit in memory.
+        """
+        for entry in self.entries():
+            if asin is not None and entry.get('asin') != asin:
+                continue
+            if kind is not None and entry.get('kind') != kind:
+                continue
+            try:
+                yield entry, self.read(entry['hash'])
+            except OSError:
+                continue  # body already pruned
+
+    def latest(self, kind='product'):
+        """Most recent capture entry per ASIN"""
+        latest = {}
+        for entry in self.entries():
+            if entry.get('kind') == kind and entry.get('asin'):
+                latest[entry['asin']] = entry
+        return latest
+
+    def prune(self):
+        """Apply the retention policy, return (captures dropped, bodies deleted)
+
+        Captures older than max_age_days go first; then the oldest captures are
+        dropped until the bodies still referenced fit in max_bytes.
+        """
+        with self.lock:
+            entries = list(self.entries())
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+
+            kept = []
+            kept_hashes = set()
+            total = 0
+            for entry in reversed(entries):  # newest first
+                if entry['timestamp'] < cutoff:
+                    continue
+                if entry['hash'] not in kept_hashes:
+                    if total + entry['stored_size'] > self.max_bytes:
+                        continue
+                    kept_hashes.add(entry['hash'])
+                    total += entry['stored_size']
+                kept.append(entry)
+            kept.reverse()
+
+            if len(kept) < len(entries):
+                tmp_path = self.index_path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    for entry in kept:
+                        f.write(json.dumps(entry) + '\n')
+                os.replace(tmp_path, self.index_path)
+
+            deleted = 0
+            if os.path.isdir(self.objects_dir):
+                for root, _, files in os.walk(self.objects_dir, topdown=False):
+                    for name in files:
+                        if name.split('.')[0] not in kept_hashes:
+                            os.remove(os.path.join(root, name))
+                            deleted += 1
+                    if root != self.objects_dir and not os.listdir(root):
+                        os.rmdir(root)
+            return len(entries) - len(kept), deleted
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['captured']} pages captured, {stats['deduplicated']} unchanged, "
+                f"{stats['bytes_written'] / 1024:.0f} KB written")
+
+
+USAGE = """Usage:
+  python captures.py stats .tracker_cache/captures
+  python captures.py prune .tracker_cache/captures
+  python captures.py extract .tracker_cache/captures ASIN output.html"""
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'stats':
+        store = CaptureStore(sys.argv[2])
+        entries = list(store.entries())
+        hashes = {entry['hash']: entry for entry in entries}
+        raw = sum(entry['size'] for entry in entries)
+        stored = sum(entry['stored_size'] for entry in hashes.values())
+        print(f'🗃️  {len(entries)} captures of {len({e["url"] for e in entries})} URLs, '
+              f'{len(hashes)} distinct pages')
+        print(f'   {raw / 1024 / 1024:.1f} MB captured, {stored / 1024 / 1024:.1f} MB on disk')
+    elif len(sys.argv) == 3 and sys.argv[1] == 'prune':
+        dropped, deleted = CaptureStore(sys.argv[2]).prune()
+        print(f'🧹 Dropped {dropped} captures, deleted {deleted} page bodies')
+    elif len(sys.argv) == 5 and sys.argv[1] == 'extract':
+        store = CaptureStore(sys.argv[2])
+        entry = store.latest().get(sys.argv[3])
+        if entry is None:
+            print(f'No capture for {sys.argv[3]}')
+            sys.exit(1)
+        with open(sys.argv[4], 'wb') as f:
+            f.write(store.read(entry['hash']))
+        print(f'💾 Wrote {sys.argv[3]} as captured at {entry["timestamp"]} to {sys.argv[4]}')
+    else:
+        print(USAGE)
+        sys.exit(1)
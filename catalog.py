@@ -0,0 +1,186 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime
+
+RECENT_PRICES = 20  # $/oz observations kept per ASIN for volatility
+
+
+class AsinCatalog:
+    """Persistent catalog of known ASINs with a freshness-aware check order"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.last_discovery_run = None
+        self.products = {}  # asin -> {last_checked, prices, misses, ...}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                self.runs = data.get('runs', 0)
+                self.last_discovery_run = data.get('last_discovery_run')
+                self.products = data.get('products', {})
+            except (OSError, ValueError):
+                pass
+
+    def start_run(self):
+        self.runs += 1
+
+    def needs_discovery(self, every_n_runs):
+        """Whether this run should re-crawl search results for new ASINs"""
+        if not self.products or self.last_discovery_run is None:
+            return True
+        return self.runs - self.last_discovery_run >= every_n_runs
+
+    def add_discovered(self, asins, cards=None):
+        """Add ASINs found by a search crawl, return how many were new
+
+        cards ({asin: search card}) replace the products' stored cards.
+        """
+        new = 0
+        now = datetime.now().isoformat()
+        with self.lock:
+            for asin in asins:
+                if asin not in self.products:
+                    self.products[asin] = {'first_seen': now, 'last_checked': None, 'prices': [], 'misses': 0}
+                    new += 1
+                card = (cards or {}).get(asin)
+                if card is not None:
+                    self.products[asin]['card'] = {
+                        'title': card['title'],
+                        'fl_oz': card['fl_oz'],
+                        'price_per_oz': card['price_per_oz'],
+                        'seen_at': now,
+                    }
+            self.last_discovery_run = self.runs
+        return new
+
+    def card(self, asin, max_age):
+        """The product's search card if it was seen less than max_age seconds ago, or None"""
+        with self.lock:
+            card = self.products.get(asin, {}).get('card')
+        if not card or not card.get('seen_at'):
+            return None
+        age = (datetime.now() - datetime.fromisoformat(card['seen_at'])).total_seconds()
+        return card if age < max_age else None
+
+    def seed_from_history(self, records):
+        """Fill recent prices from the stored history (used once, for an empty catalog)"""
+        with self.lock:
+            for record in records:
+                asin = record.asin
+                if not asin or record.price_per_oz is None:
+                    continue
+                product = self.products.setdefault(
+                    asin, {'first_seen': record.timestamp, 'last_checked': None, 'prices': [], 'misses': 0})
+                product['prices'] = (product['prices'] + [record.price_per_oz])[-RECENT_PRICES:]
+                seen = record.seen
+                if seen and (product['last_checked'] or '') < seen:
+                    product['last_checked'] = seen
+
+    def record_check(self, asin, price_per_oz):
+        """Remember the outcome of checking an ASIN ($/oz found, or None for a miss)"""
+        with self.lock:
+            product = self.products.setdefault(
+                asin, {'first_seen': datetime.now().isoformat(), 'last_checked': None, 'prices': [], 'misses': 0})
+            product['last_checked'] = datetime.now().isoformat()
+            if price_per_oz is not None:
+                product['prices'] = (product['prices'] + [price_per_oz])[-RECENT_PRICES:]
+                product['misses'] = 0
+            else:
+                product['misses'] += 1
+
+    def record_skip(self, asin):
+        """A product ruled out by its search card
+
+        Only resets the product's staleness: the card's $/oz is an estimate,
+        so it stays out of the recent prices (and misses).
+        """
+        with self.lock:
+            self.products[asin]['last_checked'] = datetime.now().isoformat()
+
+    def score(self, product, threshold, now):
+        """Higher means check sooner"""
+        # Staleness: hours since the last check, capped at three days
+        if product['last_checked']:
+            age = (now - datetime.fromisoformat(product['last_checked'])).total_seconds() / 3600
+            staleness = min(max(age, 0.0), 72.0) / 24
+        else:
+            staleness = 4.0  # never checked beats everything else
+        return staleness + self.promise(product, threshold)
+
+    def promise(self, product, threshold):
+        """How likely a product is to be (or become) a deal, regardless of when it was checked"""
+        prices = product['prices']
+        volatility = 0.0
+        closeness = 0.0
+        if prices:
+            # Volatility: coefficient of variation of recent $/oz
+            if len(prices) > 1:
+                mean = sum(prices) / len(prices)
+                variance = sum((p - mean) ** 2 for p in prices) / len(prices)
+                volatility = min(math.sqrt(variance) / mean, 1.0) if mean > 0 else 0.0
+            # Closeness: 1.0 at (or below) the threshold, fading as the price moves away
+            gap = max(prices[-1] - threshold, 0.0) / threshold
+            closeness = math.exp(-3 * gap)
+
+        # Products that keep failing (out of stock, not Monster, no price) sink
+        penalty = min(product['misses'], 5) * 0.5
+        return 2 * volatility + 2 * closeness - penalty
+
+    def check_interval(self, product, threshold, shortest, longest):
+        """Seconds to wait between checks of a product (used by watch mode)
+
+        Each point of promise divides the interval by four, so a product at the
+        threshold is checked 16x as often as an unremarkable one.
+        """
+        return min(max(longest / 4 ** self.promise(product, threshold), shortest), longest)
+
+    def due(self, threshold, shortest, longest):
+        """ASINs whose check interval has passed, most overdue (relative to their interval) first"""
+        now = datetime.now()
+        overdue = []
+        with self.lock:
+            for asin, product in self.products.items():
+                if not product['last_checked']:
+                    overdue.append((float('inf'), asin))
+                    continue
+                age = (now - datetime.fromisoformat(product['last_checked'])).total_seconds()
+                interval = self.check_interval(product, threshold, shortest, longest)
+                if age >= interval:
+                    overdue.append((age / interval, asin))
+        overdue.sort(key=lambda item: item[0], reverse=True)
+        return [asin for _, asin in overdue]
+
+    def next_due(self, threshold, shortest, longest):
+        """Seconds until the next product becomes due (0 if one already is)"""
+        now = datetime.now()
+        wait = longest
+        with self.lock:
+            for product in self.products.values():
+                if not product['last_checked']:
+                    return 0.0
+                age = (now - datetime.fromisoformat(product['last_checked'])).total_seconds()
+                wait = min(wait, self.check_interval(product, threshold, shortest, longest) - age)
+        return max(wait, 0.0)
+
+    def prioritized(self, threshold):
+        """Known ASINs ordered by how likely they are to have become a deal"""
+        now = datetime.now()
+        with self.lock:
+            ranked = sorted(self.products.items(), key=lambda item: self.score(item[1], threshold, now), reverse=True)
+        return [asin for asin, _ in ranked]
+
+    def save(self):
+        with self.lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'runs': self.runs,
+                    'last_discovery_run': self.last_discovery_run,
+                    'products': self.products,
+                }, f)
+            os.replace(tmp_path, self.path)
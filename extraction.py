@@ -0,0 +1,435 @@
+import json
+import os
+import re
+import threading
+import time
+
+from lxml import etree, html
+
+# Parse with libxml2 once, then only visit the regions we care about via XPath
+PARSER = html.HTMLParser(huge_tree=True)
+
+PRICE_RE = re.compile(r'\$?([\d,]+\.?\d*)')
+
+# Markers that mean a block belongs to a recommendation carousel, not this ASIN
+CAROUSEL_MARKERS = ('carousel', 'faceout', 'alternative')
+SECTION_SKIP_WORDS = ('carousel', 'faceout', 'alternative', 'data-asin', 'consider these')
+
+# Text inside these tags isn't visible page text (BeautifulSoup's get_text skips it too)
+NON_TEXT_TAGS = {'script', 'style', 'template'}
+
+# Pack size patterns, most specific first. Each has two numeric groups whose
+# product is the total fluid ounces.
+FL_OZ_PATTERNS = [
+    # "16 Ounce (Pack of 15)"
+    r'(\d+\.?\d*)\s*ounce\s*\(pack\s+of\s+(\d+)\)',
+    # "16 Fl Oz (Pack of 24)"
+    r'(\d+\.?\d*)\s*fl\.?\s*oz\.?\s*\(pack\s+of\s+(\d+)\)',
+    # "24 Pack, 16 Fl Oz"
+    r'(\d+)\s*pack[,\s]+(\d+\.?\d*)\s*fl\.?\s*oz',
+    # "Pack of 24, 16 oz"
+    r'pack\s+of\s+(\d+)[,\s]+(\d+\.?\d*)\s*(?:fl\.?\s*)?oz',
+    # "24 x 16 fl oz"
+    r'(\d+)\s*x\s*(\d+\.?\d*)\s*fl\.?\s*oz',
+    # "(24 Count) 16 oz"
+    r'\((\d+)\s*count\)[,\s]*(\d+\.?\d*)\s*(?:fl\.?\s*)?oz',
+    # "24-Pack 16 oz"
+    r'(\d+)-pack\s+(\d+\.?\d*)\s*oz',
+]
+FL_OZ_COMPILED = [re.compile(pattern) for pattern in FL_OZ_PATTERNS]
+
+_BY_ID = etree.XPath('//*[@id=$id]')
+_CLASS_TOKEN = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+_PRICE_WHOLE = etree.XPath('(.//span[' + _CLASS_TOKEN.format('a-price-whole') + '])[1]')
+_PRICE_FRACTION = etree.XPath('(.//span[' + _CLASS_TOKEN.format('a-price-fraction') + '])[1]')
+_OFFSCREEN = etree.XPath('(.//span[' + _CLASS_TOKEN.format('a-offscreen') + '])[1]')
+_OFFERS = etree.XPath(".//div[contains(@id, 'aod-offer-')]")
+_SOLD_BY = etree.XPath("(.//div[contains(@id, 'aod-offer-soldBy-')])[1]")
+_SECTIONS = etree.XPath("//div[contains(@class, 'a-section')]")
+_SEARCH_CARDS = etree.XPath("//div[@data-component-type='s-search-result']")
+_CARD_TITLE = etree.XPath('(.//h2)[1]')
+# The card's own price, not the "($0.07/Fl Oz)" unit price shown as a-text-price
+_CARD_PRICE = etree.XPath('(.//span[' + _CLASS_TOKEN.format('a-price') + " and not(contains(@class, 'a-text-price'))]"
+                          '//span[' + _CLASS_TOKEN.format('a-offscreen') + '])[1]')
+
+
+def parse_html(content):
+    """Parse a page into an lxml document"""
+    return html.document_fromstring(content, parser=PARSER)
+
+
+def find_by_id(doc, element_id, tag=None):
+    """First element with the given id (optionally restricted to a tag)"""
+    for elem in _BY_ID(doc, id=element_id):
+        if tag is None or elem.tag == tag:
+            return elem
+    return None
+
+
+def first(xpath, elem):
+    found = xpath(elem)
+    return found[0] if found else None
+
+
+def get_text(elem, strip=False):
+    """Visible text of an element, matching BeautifulSoup's get_text()"""
+    parts = []
+    stack = [(elem, False)]
+    while stack:
+        node, is_tail = stack.pop()
+        if is_tail:
+            parts.append(node.tail)
+            continue
+        if not isinstance(node.tag, str) or node.tag in NON_TEXT_TAGS:
+            continue  # comments, processing instructions, scripts
+        if node.text:
+            parts.append(node.text)
+        for child in reversed(node):
+            if child.tail:
+                stack.append((child, True))
+            stack.append((child, False))
+    if strip:
+        return ''.join(part.strip() for part in parts)
+    return ''.join(parts)
+
+
+def _own_markup(node):
+    """Pieces of raw markup that belong to a node itself (not its children)"""
+    pieces = []
+    if isinstance(node.tag, str):
+        pieces.append(node.tag)
+        for name, value in node.attrib.items():
+            pieces.append(name)
+            pieces.append(value)
+    if node.text:
+        pieces.append(node.text)
+    for child in node:
+        if child.tail:
+            pieces.append(child.tail)
+    return pieces
+
+
+def marker_flags(doc):
+    """Which elements contain carousel markers anywhere in their markup
+
+    Returns {element: (has_carousel_marker, has_section_skip_word)}. This is
+    what checking str(element) for each section used to answer, but computed
+    bottom-up in a single pass instead of re-serializing every subtree.
+    """
+    flags = {}
+    for node in reversed(list(doc.iter())):
+        pieces = _own_markup(node)
+        carousel = any(marker in piece for piece in pieces for marker in CAROUSEL_MARKERS)
+        lowered = [piece.lower() for piece in pieces]
+        skip = any(word in piece for piece in lowered for word in SECTION_SKIP_WORDS)
+        for child in node:
+            child_carousel, child_skip = flags[child]
+            carousel = carousel or child_carousel
+            skip = skip or child_skip
+        flags[node] = (carousel, skip)
+    return flags
+
+
+def parse_price(text):
+    match = PRICE_RE.search(text)
+    return float(match.group(1).replace(',', '')) if match else None
+
+
+def parse_fluid_oz(text):
+    """Total fluid ounces from a pack-size description, or None
+
+    The first pattern in FL_OZ_PATTERNS that matches wins.
+    """
+    if not text:
+        return None
+
+    text_lower = text.lower()
+    if 'oz' not in text_lower and 'ounce' not in text_lower:
+        return None  # every pattern needs one of these
+
+    for pattern in FL_OZ_COMPILED:
+        match = pattern.search(text_lower)
+        if match:
+            return float(match.group(1)) * float(match.group(2))
+    return None
+
+
+def extract_title(doc):
+    title_elem = find_by_id(doc, 'productTitle', 'span')
+    return get_text(title_elem, strip=True) if title_elem is not None else None
+
+
+def extract_availability_text(doc):
+    """Lowercased availability blurb, or None if the page doesn't have one"""
+    availability_elem = find_by_id(doc, 'availability', 'div')
+    return get_text(availability_elem, strip=True).lower() if availability_elem is not None else None
+
+
+def extract_prices(doc, debug=False):
+    """Collect (source, price, seller) candidates for the page's own ASIN"""
+    prices_found = []
+    flags = None
+
+    # Method 1: Buy box in the right column (most reliable for the actual product)
+    buy_box_section = find_by_id(doc, 'rightCol', 'div')
+    if buy_box_section is None:
+        buy_box_section = find_by_id(doc, 'apex_desktop', 'div')
+
+    if buy_box_section is not None:
+        # Make sure we're not in a carousel by checking for carousel markers
+        parent = buy_box_section.getparent()
+        is_in_carousel = False
+        if parent is not None:
+            flags = marker_flags(doc)
+            is_in_carousel = flags[parent][0]
+
+        if not is_in_carousel:
+            price_whole = first(_PRICE_WHOLE, buy_box_section)
+            price_fraction = first(_PRICE_FRACTION, buy_box_section)
+
+            if price_whole is not None:
+                price_str = get_text(price_whole, strip=True).replace(',', '').replace('.', '')
+                if price_fraction is not None:
+                    price_str += '.' + get_text(price_fraction, strip=True)
+                try:
+                    buybox_price = float(price_str)
+
+                    # Filter out unit prices
+                    if buybox_price >= 5.0:
+                        price_context = get_text(buy_box_section, strip=True).lower()
+                        if 'subscribe' in price_context or 'subscription' in price_context:
+                            if debug:
+                                print(f"    - Buy Box: ${buybox_price:.2f} (Subscribe & Save)")
+                            prices_found.append(('Buy Box (S&S)', buybox_price, 'Subscribe & Save'))
+                        else:
+                            prices_found.append(('Buy Box', buybox_price, 'Main listing'))
+                            if debug:
+                                print(f"    - Buy Box: ${buybox_price:.2f}")
+                    elif debug:
+                        print(f"    - Buy Box: ${buybox_price:.2f} (SKIPPED - likely unit price)")
+                except Exception as e:
+                    if debug:
+                        print(f"    - Buy Box parse error: {e}")
+
+    # Method 2: Check "Other Sellers" section for cheaper alternatives
+    other_sellers = find_by_id(doc, 'aod-offer-list', 'div')
+    if other_sellers is not None:
+        offers = _OFFERS(other_sellers)
+        if debug:
+            print(f"    - Found {len(offers)} other seller offers")
+
+        for i, offer in enumerate(offers[:10]):  # Check up to 10 offers
+            try:
+                offer_price_elem = first(_OFFSCREEN, offer)
+                if offer_price_elem is None:
+                    continue
+                offer_price = parse_price(get_text(offer_price_elem, strip=True))
+                if offer_price is None:
+                    continue
+
+                # Filter out unit prices
+                if offer_price < 5.0:
+                    if debug:
+                        print(f"    - Offer {i+1}: ${offer_price:.2f} (SKIPPED - likely unit price)")
+                    continue
+
+                # Try to get seller name
+                seller_name_elem = first(_SOLD_BY, offer)
+                seller_name = get_text(seller_name_elem, strip=True) if seller_name_elem is not None else 'Third-party'
+
+                prices_found.append(('Other Seller', offer_price, seller_name))
+                if debug:
+                    print(f"    - Offer {i+1}: ${offer_price:.2f} from {seller_name}")
+            except Exception as e:
+                if debug:
+                    print(f"    - Offer {i+1} parse error: {e}")
+
+    # Method 3: Look for price ONLY in product-specific sections, skipping any
+    # section whose markup mentions carousels, faceouts, alternatives or other ASINs
+    if not prices_found:
+        if flags is None:
+            flags = marker_flags(doc)
+
+        for section in _SECTIONS(doc):
+            if flags[section][1]:
+                continue
+
+            # Look for price in this clean section
+            price_elem = first(_OFFSCREEN, section)
+            if price_elem is None:
+                continue
+            try:
+                section_price = parse_price(get_text(price_elem, strip=True))
+            except ValueError:
+                continue
+            if section_price is not None and 5.0 <= section_price <= 100.0:
+                prices_found.append(('Section scan', section_price, 'Unknown'))
+                if debug:
+                    print(f"    - Section price: ${section_price:.2f}")
+                break  # Take first valid price
+
+        if debug and not prices_found:
+            print(f"    - No valid prices found in clean sections")
+
+    return prices_found
+
+
+def parse_search_page(content):
+    """Product cards on a search results page, in page order
+
+    Each card is {asin, title, price, fl_oz, price_per_oz}; fields the card
+    doesn't show (or that look like unit prices) are None.
+    """
+    doc = parse_html(content)
+    cards = []
+    for card in _SEARCH_CARDS(doc):
+        asin = card.get('data-asin')
+        if not asin:
+            continue
+        title_elem = first(_CARD_TITLE, card)
+        title = ' '.join(get_text(title_elem).split()) if title_elem is not None else None
+
+        price = None
+        price_elem = first(_CARD_PRICE, card)
+        if price_elem is not None:
+            try:
+                price = parse_price(get_text(price_elem, strip=True))
+            except ValueError:
+                price = None
+            if price is not None and price < 5.0:
+                price = None  # likely a unit price
+
+        fl_oz = parse_fluid_oz(title)
+        cards.append({
+            'asin': asin,
+            'title': title,
+            'price': price,
+            'fl_oz': fl_oz,
+            'price_per_oz': price / fl_oz if price and fl_oz else None,
+        })
+    return cards
+
+
+def classify_availability(avail_text):
+    """Map the availability blurb to In Stock / Out of Stock / Third-party only / Unknown"""
+    if avail_text is None:
+        return "Unknown"
+    if 'in stock' in avail_text or 'available' in avail_text:
+        return "In Stock"
+    if 'out of stock' in avail_text or 'unavailable' in avail_text:
+        return "Out of Stock"
+    if 'see all buying options' in avail_text:
+        return "Third-party only"
+    return "Unknown"
+
+
+def find_fluid_oz(title, doc):
+    """Fluid ounces and where they were found: (fl_oz, source) or (None, None)"""
+    # First try title
+    fl_oz = parse_fluid_oz(title)
+    if fl_oz:
+        return fl_oz, 'title'
+
+    # Then the product details bullets and technical details table
+    try:
+        for source, text in extract_detail_texts(doc):
+            fl_oz = parse_fluid_oz(text)
+            if fl_oz:
+                return fl_oz, source
+    except Exception:
+        pass
+
+    return None, None
+
+
+def extract_product(content, asin, known_pack=None, debug=False, find_pack_size=find_fluid_oz):
+    """Parse a product page into the plain fields check_product needs
+
+    Runs in a parse worker process, so it takes and returns only plain data.
+    known_pack is the pack-size cache entry for the ASIN; when its title
+    matches the page, fl oz extraction (find_pack_size) is skipped. Work is skipped as soon as
+    the page is known to be rejected (out of stock, no title, not Monster,
+    no price).
+    """
+    timings = {}
+    start = time.perf_counter()
+    doc = parse_html(content)
+    timings['product_parse'] = time.perf_counter() - start
+
+    title = extract_title(doc)
+    fields = {
+        'title': title,
+        'availability': classify_availability(extract_availability_text(doc)),
+        'prices': [],
+        'fl_oz': None,
+        'fl_oz_source': None,
+        'timings': timings,
+    }
+    if fields['availability'] == "Out of Stock" or not title or 'monster' not in title.lower():
+        return fields
+
+    if debug:
+        print(f"\n  🔍 DEBUG MODE for {asin}:")
+
+    # Only look at sections that belong to THIS ASIN - recommendation carousels
+    # and "Consider these alternatives" are skipped
+    start = time.perf_counter()
+    fields['prices'] = extract_prices(doc, debug=debug)
+    timings['price_extraction'] = time.perf_counter() - start
+    if not fields['prices']:
+        return fields
+
+    if known_pack and known_pack.get('title') == title:
+        fields['fl_oz'], fields['fl_oz_source'] = known_pack['fl_oz'], 'cache'
+    else:
+        start = time.perf_counter()
+        fields['fl_oz'], fields['fl_oz_source'] = find_pack_size(title, doc)
+        timings['fl_oz_extraction'] = time.perf_counter() - start
+    return fields
+
+
+def extract_detail_texts(doc):
+    """Yield (source, text) for the product detail blocks that may mention pack size"""
+    details = find_by_id(doc, 'detailBullets_feature_div', 'div')
+    if details is not None:
+        yield 'detail_bullets', get_text(details)
+
+    tech_details = find_by_id(doc, 'productDetails_techSpec_section_1', 'table')
+    if tech_details is not None:
+        yield 'tech_spec', get_text(tech_details)
+
+
+class PackSizeCache:
+    """Persistent ASIN -> (fl_oz, source) cache, invalidated when the title changes"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def entry(self, asin):
+        """Raw cache entry (plain dict) to hand to a parse worker"""
+        entry = self.entries.get(asin)
+        return dict(entry) if entry else None
+
+    def put(self, asin, title, fl_oz, source):
+        with self.lock:
+            self.entries[asin] = {'title': title, 'fl_oz': fl_oz, 'source': source}
+            self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
@@ -0,0 +1,469 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Statuses and page markers that mean "slow down", not "this page doesn't exist"
+THROTTLE_STATUSES = (429, 503)
+BLOCK_MARKERS = (
+    b'/errors/validateCaptcha',
+    b'<title>Robot Check</title>',
+    b"Sorry, we just need to make sure you're not a robot",
+)
+
+
+def block_reason(status_code, content):
+    """Why a response looks like throttling or a robot check (None if it doesn't)"""
+    if status_code in THROTTLE_STATUSES:
+        return f'http {status_code}'
+    if status_code == 200 and any(marker in content for marker in BLOCK_MARKERS):
+        return 'robot check'
+    return None
+
+
+class BlockedError(Exception):
+    """The site is throttling or blocking us and retrying didn't help"""
+
+
+class TokenBucket:
+    """Token bucket that spaces out requests to a single host
+
+    The rate backs off like the concurrency limit (AIMD): a throttled
+    response halves it (down to 1/16 of the configured rate) and drops any
+    saved-up burst; each normal response adds back a tenth of the
+    configured rate.
+    """
+    def __init__(self, rate, burst=1, jitter=0.0):
+        self.max_rate = rate  # configured tokens (requests) per second
+        self.min_rate = rate / 16
+        self.rate = rate      # current tokens (requests) per second
+        self.burst = burst    # max requests allowed back-to-back
+        self.jitter = jitter  # extra random delay (seconds) so requests don't look scripted
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """Add the tokens earned at the current rate since the last update (lock held)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available, return the time spent waiting"""
+        with self.lock:
+            self.refill()
+            # Reserve a token even if we go negative - later callers queue up behind us
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if self.jitter:
+            wait += random.uniform(0, self.jitter)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, throttled):
+        """Adjust the rate after a response"""
+        with self.lock:
+            self.refill()
+            if throttled:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class AdaptiveConcurrency:
+    """AIMD cap on requests in flight
+
+    Each normal response raises the limit by 1/limit (about +1 per round of
+    requests); each throttled response halves it, down to one at a time.
+    At low request rates there's rarely more than one request in flight, so
+    the host's TokenBucket backs off its rate as well.
+    """
+    def __init__(self, maximum):
+        self.maximum = max(maximum, 1)
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class CircuitBreaker:
+    """Trips after `threshold` fetches in a row end throttled, so the run can stop early"""
+    def __init__(self, threshold=3):
+        self.threshold = threshold
+        self.consecutive = 0
+        self.open = False
+        self.reason = None
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def record(self, reason):
+        """Record a fetch outcome (block reason, or None if it got through)"""
+        with self.lock:
+            if reason is None:
+                self.consecutive = 0
+                return
+            self.consecutive += 1
+            if self.consecutive >= self.threshold and not self.open:
+                self.open = True
+                self.reason = reason
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        """Close the breaker again (watch mode does this after a cooldown)"""
+        with self.lock:
+            self.open = False
+            self.consecutive = 0
+            self.reason = None
+            self.opened_at = None
+
+    def describe(self):
+        return f"blocked ({self.reason}, {self.threshold} fetches in a row after retries)"
+
+
+class Page:
+    """Minimal response object shared by network fetches and cache hits"""
+    def __init__(self, url, status_code, content, headers=None, from_cache=False, blocked=None, fetched_at=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache  # served without asking the site (a 304 revalidation isn't)
+        self.blocked = blocked  # block reason if retries ran out while throttled
+        self.fetched_at = fetched_at or time.time()  # when the site last returned this content
+
+    @property
+    def text(self):
+        content_type = self.headers.get('Content-Type', '')
+        encoding = 'utf-8'
+        if 'charset=' in content_type:
+            encoding = content_type.split('charset=')[-1].split(';')[0].strip() or encoding
+        try:
+            return self.content.decode(encoding, errors='replace')
+        except LookupError:
+            return self.content.decode('utf-8', errors='replace')
+
+
+class ResponseCache:
+    """On-disk response cache keyed by URL with TTLs, revalidation and LRU eviction"""
+    def __init__(self, directory, ttl_rules=None, default_ttl=3600, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.ttl_rules = ttl_rules or []  # [(url substring, ttl seconds)], first match wins
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, 'index.json')
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self.index = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+
+    def key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def ttl_for(self, url):
+        for marker, ttl in self.ttl_rules:
+            if marker in url:
+                return ttl
+        return self.default_ttl
+
+    def body_path(self, key):
+        return os.path.join(self.directory, f'{key}.html')
+
+    def lookup(self, url, max_age=None):
+        """Return (entry, is_fresh) for a URL, or (None, False) if it isn't cached
+
+        max_age (seconds) caps the URL's TTL for this lookup.
+        """
+        key = self.key(url)
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None or not os.path.exists(self.body_path(key)):
+                return None, False
+            entry['last_used'] = time.time()
+            ttl = self.ttl_for(url) if max_age is None else min(self.ttl_for(url), max_age)
+            fresh = time.time() - entry['stored_at'] < ttl
+            return dict(entry, key=key), fresh
+
+    def conditional_headers(self, entry):
+        """Revalidation headers for a stale entry"""
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def load(self, entry):
+        """Build a Page from a cached entry"""
+        with open(self.body_path(entry['key']), 'rb') as f:
+            content = f.read()
+        headers = {'Content-Type': entry.get('content_type', '')}
+        return Page(entry['url'], 200, content, headers, from_cache=True, fetched_at=entry['stored_at'])
+
+    def refresh(self, entry):
+        """Mark a stale entry as fresh again after a 304"""
+        with self.lock:
+            stored = self.index.get(entry['key'])
+            if stored:
+                stored['stored_at'] = time.time()
+                stored['last_used'] = stored['stored_at']
+
+    def store(self, url, response, stored_at=None):
+        """Cache a successful response body"""
+        key = self.key(url)
+        content = response.content
+        with open(self.body_path(key), 'wb') as f:
+            f.write(content)
+        now = stored_at or time.time()
+        with self.lock:
+            self.index[key] = {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'content_type': response.headers.get('Content-Type', ''),
+                'size': len(content),
+                'stored_at': now,
+                'last_used': now,
+            }
+            self.stats['stored'] += 1
+
+    def evict(self):
+        """Drop least recently used bodies until the cache fits in max_bytes"""
+        with self.lock:
+            total = sum(entry['size'] for entry in self.index.values())
+            if total <= self.max_bytes:
+                return
+            for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.body_path(key))
+                except OSError:
+                    pass
+                total -= entry['size']
+                del self.index[key]
+                self.stats['evicted'] += 1
+
+    def save(self):
+        """Evict if needed and persist the index"""
+        self.evict()
+        with self.lock:
+            tmp_path = self.index_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self.index_path)
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def summary(self):
+        stats = self.stats
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        return (f"{stats['hits']} hits, {stats['revalidated']} revalidated, "
+                f"{stats['misses']} misses ({lookups} lookups, {stats['evicted']} evicted)")
+
+
+class Fetcher:
+    """Pooled HTTP session with per-host rate limiting and bounded concurrency
+
+    Throttled responses (429/503 or a robot-check page) and connection errors
+    are retried with exponential backoff while the host's request rate and
+    the number of requests in flight back off (AIMD). Once `breaker_threshold` fetches in a row stay
+    throttled, the circuit breaker opens and every further get() raises
+    BlockedError without touching the network.
+    """
+    def __init__(self, headers, max_workers=4, rate=0.5, burst=2, jitter=1.0, timeout=15, host_limits=None, cache=None, metrics=None,
+                 retries=2, backoff=2.0, max_backoff=60.0, breaker_threshold=3):
+        self.max_workers = max_workers
+        self.retries = retries          # extra attempts per fetch
+        self.backoff = backoff          # first retry delay (seconds), doubled each attempt
+        self.max_backoff = max_backoff
+        self.concurrency = AdaptiveConcurrency(max_workers)
+        self.breaker = CircuitBreaker(breaker_threshold)
+        self.cache = cache
+        self.metrics = metrics
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.host_limits = host_limits or {}  # host -> (rate, burst, jitter)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(max_workers, 1))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def bucket_for(self, url):
+        """Get (or create) the token bucket for a URL's host"""
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                rate, burst, jitter = self.host_limits.get(host, (self.rate, self.burst, self.jitter))
+                bucket = TokenBucket(rate, burst, jitter)
+                self.buckets[host] = bucket
+            return bucket
+
+    def request(self, url, headers=None):
+        """One rate-limited network request"""
+        bucket = self.bucket_for(url)
+        self.concurrency.acquire()
+        throttled = False
+        try:
+            waited = bucket.acquire()
+            start = time.perf_counter()
+            response = self.session.get(url, timeout=self.timeout, headers=headers)
+            throttled = block_reason(response.status_code, response.content) is not None
+            bucket.record(throttled)
+        finally:
+            self.concurrency.release(throttled)
+        if self.metrics is not None:
+            self.metrics.add_time('rate_limit_wait', waited)
+            self.metrics.add_time('network', time.perf_counter() - start)
+            self.metrics.incr('requests')
+            self.metrics.incr('bytes_downloaded', len(response.content))
+            self.metrics.count('http_status', response.status_code)
+        return response
+
+    def retry_delay(self, attempt, response=None):
+        """Exponential backoff with jitter, or the server's Retry-After if longer"""
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.max_backoff))
+        return delay
+
+    def request_with_retries(self, url, headers=None):
+        """request(), retrying throttled responses and connection errors
+
+        Returns (response, block reason); the reason is set only if every
+        attempt was throttled.
+        """
+        for attempt in range(self.retries + 1):
+            if self.breaker.open:
+                raise BlockedError(self.breaker.describe())
+            try:
+                response = self.request(url, headers=headers)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                response, reason = None, 'connection error'
+            else:
+                reason = block_reason(response.status_code, response.content)
+                if reason is None:
+                    return response, None
+                if self.metrics is not None:
+                    self.metrics.count('throttled', reason)
+                if attempt == self.retries:
+                    return response, reason
+
+            delay = self.retry_delay(attempt, response)
+            if self.metrics is not None:
+                self.metrics.incr('retries')
+                self.metrics.add_time('retry_backoff', delay)
+            time.sleep(delay)
+
+    def get(self, url, max_age=None):
+        """Fetch a URL, serving fresh cache hits without touching the network
+
+        Cached copies older than max_age seconds are revalidated even within
+        their TTL (0 always asks the site). Raises BlockedError once the
+        circuit breaker is open.
+        """
+        if self.breaker.open:
+            raise BlockedError(self.breaker.describe())
+
+        entry, fresh = (None, False) if self.cache is None else self.cache.lookup(url, max_age)
+        if entry and fresh:
+            self.cache.count('hits')
+            return self.cache.load(entry)
+
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        response, reason = self.request_with_retries(url, headers=headers)
+        self.breaker.record(reason)
+        if reason is not None:
+            return Page(url, response.status_code, response.content, response.headers, blocked=reason)
+
+        if self.cache is None:
+            return Page(url, response.status_code, response.content, response.headers)
+
+        if response.status_code == 304 and entry:
+            self.cache.count('revalidated')
+            self.cache.refresh(entry)
+            page = self.cache.load(entry)
+            page.from_cache = False
+            page.fetched_at = time.time()
+            return page
+
+        self.cache.count('misses')
+        page = Page(url, response.status_code, response.content, response.headers)
+        if response.status_code == 200:
+            self.cache.store(url, response, stored_at=page.fetched_at)
+        return page
+
+    def map(self, func, items):
+        """Run func over items concurrently, yielding results in input order
+
+        At most max_workers calls are in flight. Work that hasn't started yet is
+        cancelled when the caller stops iterating early.
+        """
+        items = iter(items)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= self.max_workers:
+                    break
+
+            while pending:
+                result = pending.popleft().result()
+                for item in items:
+                    pending.append(executor.submit(func, item))
+                    break
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.save()
+        self.session.close()
@@ -0,0 +1,81 @@
+import cProfile
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class RunMetrics:
+    """Per-run stage timings and counters, written out as JSON"""
+    def __init__(self):
+        self.started = datetime.now().isoformat()
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+        self.stages = {}         # name -> {'count', 'seconds'}
+        self.counters = Counter()
+        self.groups = {}         # name -> Counter, e.g. http_status, price_method
+        self.status = 'ok'       # or why the run ended early, e.g. 'blocked (http 503, ...)'
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block. Stages run from worker threads add up, so totals can exceed wall time"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            stage = self.stages.setdefault(name, {'count': 0, 'seconds': 0.0})
+            stage['count'] += 1
+            stage['seconds'] += seconds
+
+    def incr(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def count(self, group, key):
+        """Tally a value within a group (e.g. count('http_status', 200))"""
+        with self.lock:
+            self.groups.setdefault(group, Counter())[str(key)] += 1
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'started': self.started,
+                'status': self.status,
+                'wall_seconds': round(time.perf_counter() - self.start_time, 3),
+                'stages': {
+                    name: {'count': stage['count'], 'seconds': round(stage['seconds'], 4)}
+                    for name, stage in sorted(self.stages.items())
+                },
+                'counters': dict(self.counters),
+                **{group: dict(counter) for group, counter in self.groups.items()},
+            }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def summary(self):
+        data = self.to_dict()
+        parts = [f"{name} {stage['seconds']:.1f}s" for name, stage in data['stages'].items()]
+        return f"{data['wall_seconds']:.1f}s wall, {data['status']} | " + ', '.join(parts)
+
+
+@contextmanager
+def profiled(path):
+    """Run a block under cProfile and dump the stats to path (no-op if path is None)"""
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -0,0 +1,110 @@
+import json
+import sys
+
+
+class Observation:
+    """One price observation of one product
+
+    Replaces the per-result dicts: fields live in slots, the repetitive strings
+    (retailer, title, seller, availability) are interned so the full history
+    shares one copy of each, and the product link isn't stored (the adapter
+    that fetched the page builds it from the ASIN). In a compacted history
+    one observation stands for a run of identical sightings (see
+    storage.compact_records).
+    """
+    __slots__ = ('retailer', 'asin', 'title', 'price', 'fl_oz', 'price_per_oz',
+                 'seller_info', 'availability', 'timestamp', 'last_seen', 'observation_count')
+
+    # Everything that identifies a price run; timestamp/last_seen/count only say when and how often
+    STATE_FIELDS = ('retailer', 'asin', 'title', 'price', 'fl_oz', 'price_per_oz', 'seller_info', 'availability')
+
+    def __init__(self, retailer, asin, title, price, fl_oz, price_per_oz, seller_info=None, availability=None,
+                 timestamp=None, last_seen=None, observation_count=None):
+        self.retailer = _intern(retailer)
+        self.asin = asin
+        self.title = _intern(title)
+        self.price = price
+        self.fl_oz = fl_oz
+        self.price_per_oz = price_per_oz
+        self.seller_info = _intern(seller_info)
+        self.availability = _intern(availability)
+        self.timestamp = timestamp
+        self.last_seen = last_seen                  # None: same as timestamp
+        self.observation_count = observation_count  # None: not a compacted record
+
+    @property
+    def seen(self):
+        """When this was last observed"""
+        return self.last_seen or self.timestamp
+
+    @property
+    def count(self):
+        """How many sightings this record stands for"""
+        return self.observation_count or 1
+
+    def state(self):
+        return tuple(getattr(self, field) for field in self.STATE_FIELDS)
+
+    def copy(self):
+        return Observation(*(getattr(self, field) for field in self.__slots__))
+
+    @classmethod
+    def from_dict(cls, record):
+        """Build from a history record (the stored 'link' is ignored)
+
+        This is the hot path of loading a history, so the slots are set
+        directly instead of going through __init__.
+        """
+        get = record.get
+        retailer, title = get('retailer'), get('title')
+        seller_info, availability = get('seller_info'), get('availability')
+        observation = _new(cls)
+        observation.retailer = _intern_str(retailer) if retailer.__class__ is str else retailer
+        observation.asin = get('asin')
+        observation.title = _intern_str(title) if title.__class__ is str else title
+        observation.price = get('price')
+        observation.fl_oz = get('fl_oz')
+        observation.price_per_oz = get('price_per_oz')
+        observation.seller_info = _intern_str(seller_info) if seller_info.__class__ is str else seller_info
+        observation.availability = _intern_str(availability) if availability.__class__ is str else availability
+        observation.timestamp = get('timestamp')
+        observation.last_seen = get('last_seen')
+        observation.observation_count = get('observation_count')
+        return observation
+
+    def to_dict(self):
+        """History record, leaving out unset fields and a last_seen equal to timestamp"""
+        record = {}
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is not None:
+                record[field] = value
+        if record.get('last_seen') == self.timestamp:
+            del record['last_seen']
+        return record
+
+    def __repr__(self):
+        return f"Observation({self.retailer!r}, {self.asin!r}, ${self.price_per_oz}/oz at {self.timestamp})"
+
+
+_new = object.__new__
+_intern_str = sys.intern
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _object_hook(record, from_dict=Observation.from_dict):
+    return from_dict(record) if 'asin' in record else record
+
+
+def loads_history(text):
+    """Parse a JSON history straight into Observations (no intermediate dicts kept)"""
+    return json.loads(text, object_hook=_object_hook)
+
+
+def dumps_history(observations):
+    """JSON history text: one compact record per line, so diffs stay line-based"""
+    lines = ',\n'.join(json.dumps(observation.to_dict(), separators=(',', ':')) for observation in observations)
+    return f'[\n{lines}\n]\n' if lines else '[]\n'
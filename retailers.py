@@ -0,0 +1,101 @@
+import re
+from abc import ABC, abstractmethod
+from urllib.parse import urlsplit
+
+from extraction import extract_product, find_fluid_oz, parse_search_page
+
+
+class RetailerAdapter(ABC):
+    """Everything the tracker needs to crawl one retailer
+
+    Adapters hold configuration and parsing hooks only. parse_product runs in
+    parse worker processes, so adapters must stay picklable (no sessions,
+    locks or open files). Every hook but is_first_party must be implemented;
+    an incomplete adapter can't be instantiated.
+    """
+    name = None       # shown in results and reports
+    key = None        # short id, used for per-retailer cache files
+    base_url = None   # overridable, e.g. to point at a local test server
+
+    # Politeness budget for this retailer's host
+    max_workers = 4            # pages in flight at once
+    requests_per_second = 0.5
+    request_burst = 2          # requests allowed back-to-back
+    request_jitter = 1.0       # extra random delay per request (seconds)
+
+    search_page_ttl = 6 * 3600   # seconds
+    product_page_ttl = 2 * 3600  # seconds
+
+    def __init__(self, base_url=None):
+        if base_url:
+            self.base_url = base_url.rstrip('/')
+
+    @property
+    def state_key(self):
+        """Directory name for the per-retailer catalog and pack sizes
+
+        A base URL override (e.g. a local stand-in server) gets its own
+        directory, so its products never mix with the real retailer's.
+        """
+        if self.base_url == type(self).base_url:
+            return self.key
+        host = re.sub(r'[^\w.-]', '_', urlsplit(self.base_url).netloc)
+        return f"{self.key}@{host}"
+
+    @abstractmethod
+    def search_url(self, page):
+        """URL of a page of search results for Monster Energy drinks"""
+
+    @abstractmethod
+    def product_url(self, product_id):
+        """URL of a product page"""
+
+    @abstractmethod
+    def ttl_rules(self):
+        """[(url prefix, ttl seconds)] for the shared HTTP cache"""
+
+    @abstractmethod
+    def parse_search(self, content):
+        """Product cards on a search page: [{asin, title, price, fl_oz, price_per_oz}]"""
+
+    @abstractmethod
+    def find_pack_size(self, title, doc):
+        """Total fluid ounces of a product and where they were found: (fl_oz, source)"""
+
+    @abstractmethod
+    def parse_product(self, content, product_id, known_pack=None, debug=False):
+        """Plain fields of a product page (see extraction.extract_product)"""
+
+    def is_first_party(self, seller_info):
+        """Whether the offer is sold by the retailer itself"""
+        return self.name.lower() in seller_info.lower()
+
+
+class AmazonAdapter(RetailerAdapter):
+    name = 'Amazon'
+    key = 'amazon'
+    base_url = 'https://www.amazon.com'
+
+    def search_url(self, page):
+        return f"{self.base_url}/s?k=monster+energy+drink&page={page}"
+
+    def product_url(self, asin):
+        return f"{self.base_url}/dp/{asin}"
+
+    def ttl_rules(self):
+        return [(f"{self.base_url}/s?", self.search_page_ttl), (f"{self.base_url}/dp/", self.product_page_ttl)]
+
+    def parse_search(self, content):
+        return parse_search_page(content)
+
+    def find_pack_size(self, title, doc):
+        return find_fluid_oz(title, doc)
+
+    def parse_product(self, content, asin, known_pack=None, debug=False):
+        return extract_product(content, asin, known_pack, debug, find_pack_size=self.find_pack_size)
+
+    def is_first_party(self, seller_info):
+        return 'Main listing' in seller_info or 'amazon' in seller_info.lower()
+
+
+RETAILERS = {adapter.key: adapter for adapter in (AmazonAdapter,)}
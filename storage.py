@@ -0,0 +1,371 @@
+import json
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+
+from observation import Observation, dumps_history, loads_history
+
+# SQLite columns ('link' isn't part of an Observation; it's passed to append for outside queries)
+FIELDS = ['retailer', 'asin', 'title', 'price', 'fl_oz', 'price_per_oz',
+          'link', 'seller_info', 'availability', 'timestamp', 'last_seen', 'observation_count']
+
+
+def compact_records(records, history=None):
+    """Run-length encode observations per ASIN, merging into an existing history
+
+    A new observation that matches the latest record for its ASIN only bumps
+    that record's last_seen and observation_count; any change (price, fl oz,
+    seller, availability, title) starts a new record, so every change in
+    each ASIN's timeline is kept. In a run, 'timestamp' is when it was first
+    seen and 'last_seen' the latest sighting.
+    """
+    history = list(history or [])
+    latest = {record.asin: index for index, record in enumerate(history)}
+
+    for record in records:
+        index = latest.get(record.asin)
+        if index is not None and history[index].state() == record.state():
+            run = history[index]
+            run.last_seen = record.seen
+            run.observation_count = run.count + record.count
+            continue
+        run = record.copy()
+        run.observation_count = record.count
+        latest[record.asin] = len(history)
+        history.append(run)
+
+    return history
+
+
+def is_compacted(history):
+    return any(record.observation_count is not None for record in history)
+
+
+class HistoryStore(ABC):
+    """Interface for price history backends (records are Observations)
+
+    append and records must be implemented; an incomplete backend can't be
+    instantiated.
+    """
+    @abstractmethod
+    def append(self, records, links=None):
+        """Add new observations (links: their product URLs, for backends that store them)"""
+
+    @abstractmethod
+    def records(self):
+        """Iterate over every stored observation, oldest first"""
+
+    def history(self, asin):
+        """All observations for one ASIN, oldest first"""
+        return [r for r in self.records() if r.asin == asin]
+
+    def close(self):
+        pass
+
+
+class JsonHistoryStore(HistoryStore):
+    """The original price_history.json list, rewritten in full on every save
+
+    Written one compact record per line, without product links.
+
+    With compact=True (or for a new or empty file, or once the file has been
+    compacted) repeated identical observations are folded into one record
+    per price change. Only an existing uncompacted history keeps one record
+    per check until it's migrated with `storage.py compact`.
+    A store that's kept open (as in watch mode) holds the parsed history in
+    memory and only re-reads the file if something else changed it.
+    """
+    def __init__(self, path, compact=None):
+        self.path = path
+        self.compact = compact  # None: follow the file's existing format
+        self.cached = None      # ((mtime, size), parsed history)
+
+    def signature(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        if self.cached is not None and self.cached[0] == self.signature():
+            return self.cached[1]
+        with open(self.path, 'r') as f:
+            try:
+                history = loads_history(f.read())
+            except ValueError:
+                return []
+        self.cached = (self.signature(), history)
+        return history
+
+    def append(self, records, links=None):
+        history = self.load()
+        compact = self.compact if self.compact is not None else (not history or is_compacted(history))
+        if compact:
+            history = compact_records(records, history)
+        else:
+            history.extend(records)
+        self.write(history)
+
+    def write(self, history):
+        self.cached = None
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(dumps_history(history))
+        os.replace(tmp_path, self.path)
+        self.cached = (self.signature(), history)
+
+    def records(self):
+        return iter(self.load())
+
+    def close(self):
+        self.cached = None
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """Append-only SQLite history, indexed by ASIN/time and $/oz"""
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS observations (
+                id INTEGER PRIMARY KEY,
+                retailer TEXT,
+                asin TEXT NOT NULL,
+                title TEXT,
+                price REAL,
+                fl_oz REAL,
+                price_per_oz REAL,
+                link TEXT,
+                seller_info TEXT,
+                availability TEXT,
+                timestamp TEXT,
+                last_seen TEXT,
+                observation_count INTEGER
+            )
+        """)
+        # Databases created before history compaction lack the run columns
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(observations)')}
+        for column, kind in (('last_seen', 'TEXT'), ('observation_count', 'INTEGER')):
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE observations ADD COLUMN {column} {kind}')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_obs_asin_time ON observations (asin, timestamp)')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_obs_price_per_oz ON observations (price_per_oz)')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.conn.commit()
+
+    def append(self, records, links=None):
+        columns = ', '.join(FIELDS)
+        placeholders = ', '.join('?' for _ in FIELDS)
+        links = links or [None] * len(records)
+        with self.conn:  # single transaction
+            self.conn.executemany(
+                f'INSERT INTO observations ({columns}) VALUES ({placeholders})',
+                [tuple(link if field == 'link' else getattr(r, field) for field in FIELDS)
+                 for r, link in zip(records, links)],
+            )
+
+    def _rows(self, query, params=()):
+        cursor = self.conn.execute(query, params)
+        for row in cursor:
+            yield Observation.from_dict(dict(zip(FIELDS, row)))
+
+    def records(self):
+        return self._rows(f'SELECT {", ".join(FIELDS)} FROM observations ORDER BY id')
+
+    def history(self, asin):
+        return list(self._rows(
+            f'SELECT {", ".join(FIELDS)} FROM observations WHERE asin = ? ORDER BY timestamp, id',
+            (asin,),
+        ))
+
+    def get_meta(self, key):
+        row = self.conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def close(self):
+        self.conn.close()
+
+
+class SummaryIndex:
+    """Small per-ASIN summary kept up to date alongside the history
+
+    Answers "latest price", "lowest price ever" and "last in stock" without
+    reading the history: each entry holds the last observation, the all-time
+    min/max, the observation count, the observed $/oz distribution and the
+    last few price runs.
+    """
+    RECENT_RUNS = 5
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.exists = os.path.exists(path)
+        if self.exists:
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.exists = False
+
+    @staticmethod
+    def path_for(history_path):
+        return os.path.splitext(history_path)[0] + '_summary.json'
+
+    def update(self, records):
+        """Fold new observations into the summary"""
+        for record in records:
+            asin = record.asin
+            price_per_oz = record.price_per_oz
+            if not asin or price_per_oz is None:
+                continue
+            seen = record.seen
+            count = record.count
+            entry = self.entries.setdefault(asin, {
+                'observations': 0, 'min_price_per_oz': None, 'min_timestamp': None,
+                'max_price_per_oz': None, 'last_change': 0.0, 'price_counts': {},
+                'recent': [], 'last_in_stock': None,
+            })
+
+            previous = entry.get('last')
+            if previous and previous['price_per_oz'] != price_per_oz:
+                entry['last_change'] = price_per_oz - previous['price_per_oz']
+            last = record.to_dict()
+            last.pop('observation_count', None)
+            entry['last'] = last
+            entry['observations'] += count
+            if entry['min_price_per_oz'] is None or price_per_oz < entry['min_price_per_oz']:
+                entry['min_price_per_oz'] = price_per_oz
+                entry['min_timestamp'] = record.timestamp
+            if entry['max_price_per_oz'] is None or price_per_oz > entry['max_price_per_oz']:
+                entry['max_price_per_oz'] = price_per_oz
+
+            key = repr(price_per_oz)
+            entry['price_counts'][key] = entry['price_counts'].get(key, 0) + count
+            recent = entry['recent']
+            if recent and recent[-1][0] == price_per_oz:
+                recent[-1][1] += count
+            else:
+                recent.append([price_per_oz, count])
+                del recent[:-self.RECENT_RUNS]
+
+            entry['last_availability'] = record.availability
+            if record.availability == 'In Stock':
+                entry['last_in_stock'] = seen
+
+    def rebuild(self, records):
+        """Recompute the summary from a full history (used when it's missing)"""
+        self.entries = {}
+        self.update(records)
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def _distribution(self, entry):
+        return sorted((float(price), count) for price, count in entry['price_counts'].items())
+
+    def stats(self, asin):
+        """Same shape as PriceTrends.stats, from the summary alone"""
+        entry = self.entries.get(asin)
+        if entry is None:
+            return None
+        distribution = self._distribution(entry)
+        half = entry['observations'] / 2
+        running = 0
+        median = distribution[-1][0]
+        for price, count in distribution:
+            running += count
+            if running >= half:
+                median = price
+                break
+        recent_count = sum(count for _, count in entry['recent'])
+        return {
+            'observations': entry['observations'],
+            'min': entry['min_price_per_oz'],
+            'min_time': entry['min_timestamp'],
+            'max': entry['max_price_per_oz'],
+            'median': median,
+            'rolling_avg': sum(price * count for price, count in entry['recent']) / recent_count,
+            'latest': entry['last']['price_per_oz'],
+            'last_change': entry['last_change'],
+            'last_in_stock': entry['last_in_stock'],
+        }
+
+    def percentile_rank(self, asin, price_per_oz):
+        """% of the ASIN's observations strictly cheaper than price_per_oz"""
+        entry = self.entries.get(asin)
+        if entry is None:
+            return None
+        cheaper = sum(count for price, count in self._distribution(entry) if price < price_per_oz)
+        return 100 * cheaper / entry['observations']
+
+
+def open_store(path, compact=None):
+    """Pick a history backend from the file extension"""
+    if path.endswith(('.db', '.sqlite', '.sqlite3')):
+        return SQLiteHistoryStore(path)
+    return JsonHistoryStore(path, compact=compact)
+
+
+def compact_json(path):
+    """One-time migration of a JSON history to the compacted format"""
+    store = JsonHistoryStore(path)
+    history = store.load()
+    compacted = compact_records(history)
+    store.write(compacted)
+    return len(history), len(compacted)
+
+
+def stored_links(json_path):
+    """The 'link' field of each record in a JSON history (None where there isn't one)"""
+    try:
+        with open(json_path, 'r') as f:
+            return [record.get('link') for record in json.load(f)]
+    except (OSError, ValueError):
+        return None
+
+
+def import_json(json_path, store):
+    """One-time import of an existing price_history.json into an SQLite store"""
+    source = os.path.abspath(json_path)
+    if store.get_meta('imported_from') == source:
+        return 0
+    records = JsonHistoryStore(json_path).load()
+    store.append(records, links=stored_links(json_path))
+    store.set_meta('imported_from', source)
+    return len(records)
+
+
+USAGE = """Usage:
+  python storage.py import price_history.json price_history.db
+  python storage.py compact price_history.json
+  python storage.py summarize price_history.json"""
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == 'import':
+        db = SQLiteHistoryStore(sys.argv[3])
+        count = import_json(sys.argv[2], db)
+        db.close()
+        print(f'💾 Imported {count} records into {sys.argv[3]}')
+    elif len(sys.argv) == 3 and sys.argv[1] == 'compact':
+        before, after = compact_json(sys.argv[2])
+        print(f'🗜️  Compacted {sys.argv[2]}: {before} -> {after} records')
+    elif len(sys.argv) == 3 and sys.argv[1] == 'summarize':
+        store = open_store(sys.argv[2])
+        summary = SummaryIndex(SummaryIndex.path_for(sys.argv[2]))
+        summary.rebuild(store.records())
+        store.close()
+        summary.save()
+        print(f'📇 Wrote summary of {len(summary.entries)} products to {summary.path}')
+    else:
+        print(USAGE)
+        sys.exit(1)
@@ -0,0 +1,40 @@
+import os
+import sys
+
+# Tests import the tracker's flat modules (and bench/synthetic.py) directly
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'bench'))
+
+
+class FakeResponse:
+    """The parts of a requests.Response the fetcher reads"""
+    def __init__(self, status_code=200, content=b'<html><body>page</body></html>', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Stands in for requests.Session: queued responses first, then `pages` by URL (404 otherwise)
+
+    A queued exception is raised instead of returned.
+    """
+    def __init__(self, pages=None, responses=None):
+        self.pages = pages or {}
+        self.responses = list(responses or [])
+        self.requests = []  # (url, headers) of every request made
+
+    def get(self, url, timeout=None, headers=None):
+        self.requests.append((url, dict(headers or {})))
+        if self.responses:
+            response = self.responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+        if url in self.pages:
+            return FakeResponse(200, self.pages[url], {'Content-Type': 'text/html; charset=utf-8'})
+        return FakeResponse(404, b'<html><body>Page Not Found</body></html>')
+
+    def close(self):
+        pass
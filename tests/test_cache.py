@@ -0,0 +1,144 @@
+import json
+import random
+
+import pytest
+
+from conftest import FakeResponse, FakeSession
+from fetcher import Fetcher, ResponseCache
+from retailers import AmazonAdapter
+from storage import JsonHistoryStore
+from synthetic import make_product, product_page
+from tracker import MonsterDealTracker
+
+URL = 'https://shop.test/dp/B000TEST01'
+PAGE = b'<html><body>Monster Energy</body></html>'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / 'http'), ttl_rules=[('/dp/', 3600)], default_ttl=600)
+
+
+def make_fetcher(cache, responses=None, pages=None):
+    fetcher = Fetcher({}, rate=1000, burst=100, jitter=0, cache=cache, retries=0)
+    fetcher.session = FakeSession(pages=pages, responses=responses)
+    return fetcher
+
+
+def age(cache, url, seconds):
+    """Pretend a cached entry was stored `seconds` earlier"""
+    entry = cache.index[cache.key(url)]
+    entry['stored_at'] -= seconds
+    entry['last_used'] -= seconds
+
+
+def test_ttl_rules_first_match_wins(cache):
+    cache.ttl_rules.insert(0, ('shop.test/dp/', 60))
+    assert cache.ttl_for(URL) == 60
+    assert cache.ttl_for('https://shop.test/s?k=monster') == 600
+
+
+def test_fresh_hit_is_served_without_the_network(cache):
+    fetcher = make_fetcher(cache, pages={URL: PAGE})
+    first = fetcher.get(URL)
+    second = fetcher.get(URL)
+    assert len(fetcher.session.requests) == 1
+    assert not first.from_cache and second.from_cache
+    assert second.content == PAGE
+    assert second.fetched_at == first.fetched_at  # when the site returned it, not when it was reused
+    assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+
+
+def test_stale_entry_is_revalidated(cache):
+    fetcher = make_fetcher(cache, responses=[
+        FakeResponse(200, PAGE, {'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'}),
+        FakeResponse(304, b''),
+    ])
+    fetcher.get(URL)
+    age(cache, URL, 3601)
+    page = fetcher.get(URL)
+    _, headers = fetcher.session.requests[1]
+    assert headers == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 05 Oct 2026 10:00:00 GMT'}
+    assert page.content == PAGE and page.status_code == 200
+    assert not page.from_cache  # the site was asked, so this counts as a current page
+    assert cache.stats['revalidated'] == 1
+
+    # The 304 made the entry fresh again
+    assert fetcher.get(URL).from_cache
+    assert len(fetcher.session.requests) == 2
+
+
+def test_max_age_caps_the_ttl(cache):
+    fetcher = make_fetcher(cache, pages={URL: PAGE})
+    fetcher.get(URL)
+    age(cache, URL, 120)
+    assert fetcher.get(URL, max_age=3600).from_cache
+    assert not fetcher.get(URL, max_age=60).from_cache
+    assert not fetcher.get(URL, max_age=0).from_cache
+    assert len(fetcher.session.requests) == 3
+
+
+@pytest.mark.parametrize('response', [
+    FakeResponse(404, b'<html>Page Not Found</html>'),
+    FakeResponse(503, b'<html>Service Unavailable</html>'),
+    FakeResponse(200, b"<html><title>Robot Check</title>Sorry, we just need to make sure you're not a robot</html>"),
+])
+def test_errors_and_block_pages_are_not_cached(cache, response):
+    fetcher = make_fetcher(cache, responses=[response])
+    fetcher.breaker.threshold = 10
+    fetcher.get(URL)
+    assert cache.key(URL) not in cache.index
+    assert cache.stats['stored'] == 0
+
+
+def test_eviction_drops_least_recently_used(cache):
+    cache.max_bytes = 2 * len(PAGE)
+    urls = [f'https://shop.test/dp/B000TEST0{i}' for i in range(3)]
+    fetcher = make_fetcher(cache, pages={url: PAGE for url in urls})
+    for seconds, url in zip((30, 20, 10), urls):
+        fetcher.get(url)
+        age(cache, url, seconds)
+    fetcher.get(urls[0])  # a hit makes the oldest entry the most recently used
+    cache.save()
+
+    reloaded = ResponseCache(cache.directory)
+    assert sorted(entry['url'] for entry in reloaded.index.values()) == [urls[0], urls[2]]
+    assert cache.stats['evicted'] == 1
+    assert reloaded.lookup(urls[1]) == (None, False)
+
+
+def test_results_from_cached_pages_are_not_saved_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    adapter = AmazonAdapter()
+    adapter.requests_per_second = 1000
+    adapter.request_jitter = 0
+    pages = {}
+    for seed in range(3, 8):
+        rng = random.Random(seed)
+        product = make_product(rng)
+        pages[adapter.product_url(product['asin'])] = product_page(product, rng, filler_blocks=40, script_kb=4).encode()
+    asins = [url.rsplit('/', 1)[1] for url in pages]
+    history = str(tmp_path / 'history.json')
+
+    def run():
+        tracker = MonsterDealTracker(history_file=history, retailers=[adapter])
+        tracker.captures = None
+        tracker.parse_workers = 0
+        tracker.fetchers[adapter.key].session = FakeSession(pages=pages)
+        tracker.results = tracker.check_products(adapter, asins, limit=len(asins))
+        tracker.save_results()
+        tracker.close()
+        return tracker
+
+    first = run()
+    assert len(first.results) == 5
+    assert len(JsonHistoryStore(history).load()) == 5
+
+    second = run()  # within the product page TTL: every page is a cache hit
+    assert second.fetchers[adapter.key].session.requests == []
+    assert [r.timestamp for r in second.results] == [r.timestamp for r in first.results]
+    stored = JsonHistoryStore(history).load()
+    assert len(stored) == 5
+    assert all(record.count == 1 for record in stored)
+    with open(history) as f:
+        assert len(json.load(f)) == 5
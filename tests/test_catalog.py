@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from catalog import AsinCatalog
+from retailers import AmazonAdapter
+from tracker import MonsterDealTracker
+
+CARDS = {
+    'B000CHEAP1': {'title': 'Monster Energy, 16 Fl Oz (Pack of 24)', 'fl_oz': 384.0, 'price_per_oz': 0.09},
+    'B000PRICY1': {'title': 'Monster Energy, 16 Fl Oz (Pack of 24)', 'fl_oz': 384.0, 'price_per_oz': 0.25},
+    'B000OTHER1': {'title': 'Red Bull, 8.4 Fl Oz (Pack of 24)', 'fl_oz': 201.6, 'price_per_oz': 0.15},
+}
+
+
+def expire(catalog, asin, seconds):
+    card = catalog.products[asin]['card']
+    card['seen_at'] = (datetime.fromisoformat(card['seen_at']) - timedelta(seconds=seconds)).isoformat()
+
+
+def test_cards_expire_by_age(tmp_path):
+    catalog = AsinCatalog(str(tmp_path / 'catalog.json'))
+    catalog.add_discovered(list(CARDS), CARDS)
+    assert catalog.card('B000PRICY1', 3600)['price_per_oz'] == 0.25
+    expire(catalog, 'B000PRICY1', 3600)
+    assert catalog.card('B000PRICY1', 3600) is None
+    assert catalog.card('B000UNKNOWN', 3600) is None
+
+    catalog.save()
+    assert AsinCatalog(catalog.path).card('B000CHEAP1', 3600)['title'] == CARDS['B000CHEAP1']['title']
+
+
+def test_prescreen_skips_on_fresh_cards_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    adapter = AmazonAdapter()
+    tracker = MonsterDealTracker(history_file=str(tmp_path / 'history.json'), retailers=[adapter])
+    catalog = tracker.catalogs[adapter.key]
+    catalog.add_discovered(list(CARDS) + ['B000NOCARD'], CARDS)
+
+    assert tracker.prescreen(adapter, list(CARDS) + ['B000NOCARD']) == ['B000CHEAP1', 'B000NOCARD']
+    for asin in ('B000PRICY1', 'B000OTHER1'):
+        product = catalog.products[asin]
+        assert product['last_checked'] is not None
+        assert product['prices'] == [] and product['misses'] == 0  # estimates aren't observations
+
+    # Once the crawl is older than the search page TTL, the product page decides again
+    expire(catalog, 'B000PRICY1', adapter.search_page_ttl)
+    assert tracker.prescreen(adapter, ['B000PRICY1', 'B000OTHER1']) == ['B000PRICY1']
+
+
+def test_base_url_override_keeps_its_own_state(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    real, stand_in = AmazonAdapter(), AmazonAdapter(base_url='http://127.0.0.1:8000/')
+    assert real.state_key == 'amazon' and stand_in.state_key == 'amazon@127.0.0.1_8000'
+
+    tracker = MonsterDealTracker(history_file=str(tmp_path / 'history.json'), retailers=[stand_in])
+    tracker.catalogs[stand_in.key].add_discovered(list(CARDS), CARDS)
+    tracker.catalogs[stand_in.key].save()
+    assert (tmp_path / '.tracker_cache' / 'amazon@127.0.0.1_8000' / 'catalog.json').exists()
+
+    tracker = MonsterDealTracker(history_file=str(tmp_path / 'history.json'), retailers=[real])
+    assert tracker.catalogs[real.key].products == {}
@@ -0,0 +1,160 @@
+import random
+import re
+
+import pytest
+
+from extraction import FL_OZ_PATTERNS
+from fetcher import Page
+from retailers import AmazonAdapter
+from synthetic import make_product, product_page
+from tracker import MonsterDealTracker
+
+bs4 = pytest.importorskip('bs4')
+
+
+def reference_fluid_oz(text):
+    if not text:
+        return None
+    text_lower = text.lower()
+    for pattern in FL_OZ_PATTERNS:
+        match = re.search(pattern, text_lower)
+        if match:
+            return float(match.group(1)) * float(match.group(2))
+    return None
+
+
+def reference_product(content):
+    """The BeautifulSoup extraction the lxml code replaced, minus the network and debug output"""
+    soup = bs4.BeautifulSoup(content, 'html.parser')
+
+    title_elem = soup.find('span', {'id': 'productTitle'})
+    title = title_elem.get_text(strip=True) if title_elem else None
+
+    availability = 'Unknown'
+    availability_elem = soup.find('div', {'id': 'availability'})
+    if availability_elem:
+        avail_text = availability_elem.get_text(strip=True).lower()
+        if 'in stock' in avail_text or 'available' in avail_text:
+            availability = 'In Stock'
+        elif 'out of stock' in avail_text or 'unavailable' in avail_text:
+            return None
+        elif 'see all buying options' in avail_text:
+            availability = 'Third-party only'
+
+    if not title or 'monster' not in title.lower():
+        return None
+
+    prices_found = []
+    buy_box_section = soup.find('div', {'id': 'rightCol'}) or soup.find('div', {'id': 'apex_desktop'})
+    if buy_box_section:
+        parent_text = str(buy_box_section.parent) if buy_box_section.parent else ''
+        if not any(marker in parent_text for marker in ['carousel', 'faceout', 'alternative']):
+            price_whole = buy_box_section.find('span', class_='a-price-whole')
+            price_fraction = buy_box_section.find('span', class_='a-price-fraction')
+            if price_whole:
+                price_str = price_whole.get_text(strip=True).replace(',', '').replace('.', '')
+                if price_fraction:
+                    price_str += '.' + price_fraction.get_text(strip=True)
+                buybox_price = float(price_str)
+                if buybox_price >= 5.0:
+                    price_context = buy_box_section.get_text(strip=True).lower()
+                    if 'subscribe' in price_context or 'subscription' in price_context:
+                        prices_found.append(('Buy Box (S&S)', buybox_price, 'Subscribe & Save'))
+                    else:
+                        prices_found.append(('Buy Box', buybox_price, 'Main listing'))
+
+    other_sellers = soup.find('div', {'id': 'aod-offer-list'})
+    if other_sellers:
+        for offer in other_sellers.find_all('div', {'id': re.compile(r'aod-offer-')})[:10]:
+            offer_price_elem = offer.find('span', class_='a-offscreen')
+            if not offer_price_elem:
+                continue
+            match = re.search(r'\$?([\d,]+\.?\d*)', offer_price_elem.get_text(strip=True))
+            if not match:
+                continue
+            offer_price = float(match.group(1).replace(',', ''))
+            if offer_price < 5.0:
+                continue
+            seller_name_elem = offer.find('div', {'id': re.compile(r'aod-offer-soldBy-')})
+            seller_name = seller_name_elem.get_text(strip=True) if seller_name_elem else 'Third-party'
+            prices_found.append(('Other Seller', offer_price, seller_name))
+
+    if not prices_found:
+        for section in soup.find_all('div', class_=re.compile(r'a-section.*')):
+            section_html = str(section)
+            if any(word in section_html.lower() for word in ['carousel', 'faceout', 'alternative', 'data-asin', 'consider these']):
+                continue
+            price_elem = section.find('span', class_='a-offscreen')
+            if price_elem:
+                match = re.search(r'\$?([\d,]+\.?\d*)', price_elem.get_text(strip=True))
+                if match:
+                    section_price = float(match.group(1).replace(',', ''))
+                    if 5.0 <= section_price <= 100.0:
+                        prices_found.append(('Section scan', section_price, 'Unknown'))
+                        break
+
+    if not prices_found:
+        return None
+    prices_found.sort(key=lambda x: x[1])
+    _, price, seller_info = prices_found[0]
+
+    fl_oz = reference_fluid_oz(title)
+    if not fl_oz:
+        for elem in (soup.find('div', {'id': 'detailBullets_feature_div'}),
+                     soup.find('table', {'id': 'productDetails_techSpec_section_1'})):
+            if elem:
+                fl_oz = reference_fluid_oz(elem.get_text())
+                if fl_oz:
+                    break
+    if not fl_oz or fl_oz < 64:
+        return None
+
+    return {
+        'title': title,
+        'price': price,
+        'fl_oz': fl_oz,
+        'price_per_oz': round(price / fl_oz, 4),
+        'seller_info': seller_info or 'Amazon/Unknown',
+        'availability': availability,
+    }
+
+
+def variant_page(seed):
+    """A synthetic product page; some drop the carousels or the buy box so every price source is used"""
+    rng = random.Random(seed)
+    product = make_product(rng)
+    html = product_page(product, rng, filler_blocks=40, script_kb=4)
+    if seed % 3 == 0:
+        html = html.replace('id="rightCol"', 'id="rightColumn"')
+    elif seed % 3 == 1:
+        # Without carousels next to it, the buy box price counts
+        html = re.sub(r'<div class="a-section a-carousel-container">.*?</ol></div>', '', html)
+    if seed % 7 == 0:
+        html = html.replace('<div id="aod-offer-list">', '<div id="aod-offer-list-old">')
+    return product['asin'], html.encode('utf-8')
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tracker = MonsterDealTracker(history_file=str(tmp_path / 'history.json'))
+    tracker.captures = None
+    return tracker
+
+
+def test_lxml_extraction_matches_beautifulsoup(tracker, capsys):
+    adapter = AmazonAdapter()
+    checked = 0
+    for seed in range(150):
+        asin, content = variant_page(seed)
+        tracker.fetchers[adapter.key].get = lambda url, max_age=None, content=content: Page(url, 200, content)
+        tracker.pack_sizes[adapter.key].entries.clear()
+        result = tracker.check_product(adapter, asin)
+        actual = None if result is None else {
+            field: getattr(result, field)
+            for field in ('title', 'price', 'fl_oz', 'price_per_oz', 'seller_info', 'availability')
+        }
+        assert actual == reference_product(content), seed
+        checked += result is not None
+    capsys.readouterr()
+    assert checked > 50  # most variants yield a result, so prices and pack sizes are compared too
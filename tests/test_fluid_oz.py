@@ -0,0 +1,46 @@
+import random
+import re
+
+import pytest
+
+from extraction import FL_OZ_PATTERNS, parse_fluid_oz
+
+
+def sequential_fluid_oz(text):
+    """The original matcher: try each pattern in priority order"""
+    if not text:
+        return None
+    text_lower = text.lower()
+    for pattern in FL_OZ_PATTERNS:
+        match = re.search(pattern, text_lower)
+        if match:
+            return float(match.group(1)) * float(match.group(2))
+    return None
+
+
+PIECES = [
+    '{a} Ounce (Pack of {b})', '{a} Fl Oz (Pack of {b})', '{b} Pack, {a} Fl Oz', 'Pack of {b}, {a} oz',
+    '{b} x {a} fl oz', '({b} Count) {a} oz', '{b}-Pack {a} oz', '{b} pack {a} fl. oz.', '{a} oz',
+    'Monster Energy', 'Zero Ultra', '-', 'also in', '(pack of {b})', 'fl oz', '{a}',
+]
+
+
+@pytest.mark.parametrize('text', [
+    'Monster Energy 24 Pack 16 Fl Oz (Pack of 24) - also in 12 Fl Oz (Pack of 12)',
+    '5 pack 4 fl oz (pack of 2) 7 fl oz (pack of 3)',
+    'Monster Energy Ultra, 16 Ounce (Pack of 15)',
+    'Monster Energy Drink, 24 x 16 fl oz',
+    'Monster Energy Drink, Green, Original',
+    '',
+])
+def test_matches_sequential_patterns(text):
+    assert parse_fluid_oz(text) == sequential_fluid_oz(text)
+
+
+def test_matches_sequential_patterns_on_random_titles():
+    rng = random.Random(5)
+    for _ in range(5000):
+        pieces = [rng.choice(PIECES).format(a=rng.choice(['12', '15.5', '16', '24']), b=rng.choice(['4', '12', '24']))
+                  for _ in range(rng.randint(1, 5))]
+        text = ' '.join(pieces)
+        assert parse_fluid_oz(text) == sequential_fluid_oz(text), text
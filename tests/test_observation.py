@@ -0,0 +1,109 @@
+import json
+import random
+import subprocess
+import sys
+
+import pytest
+
+from conftest import REPO_DIR
+from observation import Observation, dumps_history, loads_history
+from retailers import AmazonAdapter
+from storage import JsonHistoryStore, SQLiteHistoryStore, compact_records, import_json
+from tracker import MonsterDealTracker
+
+
+def random_observation(rng, asin=None):
+    price = rng.choice([None, round(rng.uniform(5, 60), 2)])
+    fl_oz = rng.choice([None, 192.0, 256.0, 384.0])
+    timestamp = f'2026-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}T0{rng.randint(0, 9)}:00:00.{rng.randint(0, 999999):06d}'
+    compacted = rng.random() < 0.5
+    return Observation(
+        rng.choice(['Amazon', 'Mirror', None]),
+        asin or f'B0{rng.randint(0, 99999999):08d}',
+        rng.choice(['Monster Energy Zero Ultra, 16 Fl Oz (Pack of 24)', 'Monster “Mango Loco” ½ price', None]),
+        price,
+        fl_oz,
+        round(price / fl_oz, 4) if price and fl_oz else None,
+        rng.choice(['Amazon.com', 'Subscribe & Save', None]),
+        rng.choice(['In Stock', 'Third-party only', 'Unknown', None]),
+        timestamp,
+        timestamp[:-6] + '999999' if compacted and rng.random() < 0.8 else None,
+        rng.randint(1, 50) if compacted else None,
+    )
+
+
+def snapshot(observation):
+    """Everything an Observation says, however it's stored"""
+    return observation.state() + (observation.timestamp, observation.seen, observation.count,
+                                  observation.observation_count)
+
+
+def test_json_round_trip_is_lossless():
+    rng = random.Random(18)
+    observations = [random_observation(rng) for _ in range(500)]
+    loaded = loads_history(dumps_history(observations))
+    assert [snapshot(o) for o in loaded] == [snapshot(o) for o in observations]
+    assert loads_history(dumps_history([])) == []
+
+
+def test_legacy_records_load_without_their_link():
+    legacy = {
+        'retailer': 'Amazon', 'asin': 'B000TEST01', 'title': 'Monster Energy 16 Fl Oz (Pack of 24)',
+        'price': 38.4, 'fl_oz': 384.0, 'price_per_oz': 0.1, 'link': 'https://www.amazon.com/dp/B000TEST01',
+        'seller_info': 'Amazon.com', 'availability': 'In Stock', 'timestamp': '2025-01-02T03:04:05',
+    }
+    loaded, = loads_history(json.dumps([legacy]))
+    assert loaded.to_dict() == {field: value for field, value in legacy.items() if field != 'link'}
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_json_store_round_trip(tmp_path, compact):
+    rng = random.Random(3)
+    observations = [random_observation(rng, asin=rng.choice(['B000TEST01', 'B000TEST02'])) for _ in range(50)]
+    expected = compact_records(observations) if compact else observations
+    store = JsonHistoryStore(str(tmp_path / 'history.json'), compact=compact)
+    store.append(observations)
+    assert [snapshot(o) for o in JsonHistoryStore(store.path).load()] == [snapshot(o) for o in expected]
+
+
+def test_sqlite_round_trip_and_links(tmp_path):
+    rng = random.Random(4)
+    observations = [random_observation(rng) for _ in range(100)]
+    links = [f'http://mirror.test/dp/{o.asin}' for o in observations]
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    store.append(observations[:50], links=links[:50])
+    store.append(observations[50:])
+    assert [snapshot(o) for o in store.records()] == [snapshot(o) for o in observations]
+    stored = [row[0] for row in store.conn.execute('SELECT link FROM observations ORDER BY id')]
+    assert stored == links[:50] + [None] * 50
+    store.close()
+
+
+def test_import_keeps_stored_links(tmp_path):
+    json_path = tmp_path / 'history.json'
+    json_path.write_text(json.dumps([
+        {'retailer': 'Amazon', 'asin': 'B000TEST01', 'price_per_oz': 0.1, 'link': 'https://www.amazon.com/dp/B000TEST01'},
+        {'retailer': 'Amazon', 'asin': 'B000TEST02', 'price_per_oz': 0.2},
+    ]))
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    assert import_json(str(json_path), store) == 2
+    stored = [row[0] for row in store.conn.execute('SELECT link FROM observations ORDER BY id')]
+    assert stored == ['https://www.amazon.com/dp/B000TEST01', None]
+    store.close()
+
+
+def test_links_come_from_each_trackers_own_adapter(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    mirror = MonsterDealTracker(history_file=str(tmp_path / 'mirror.json'),
+                                retailers=[AmazonAdapter(base_url='http://mirror.test')])
+    amazon = MonsterDealTracker(history_file=str(tmp_path / 'amazon.json'))
+    result = Observation('Amazon', 'B000TEST01', 'Monster Energy', 38.4, 384.0, 0.1)
+    assert mirror.product_link(result) == 'http://mirror.test/dp/B000TEST01'
+    assert amazon.product_link(result) == AmazonAdapter().product_url('B000TEST01')
+    assert amazon.product_link(Observation('Elsewhere', 'B000TEST01', None, None, None, None)) is None
+
+
+def test_storage_does_not_import_the_extraction_stack():
+    code = 'import sys, storage; print(sorted(m for m in ("lxml", "retailers", "extraction") if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '[]'
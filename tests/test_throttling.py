@@ -0,0 +1,119 @@
+import pytest
+import requests
+
+from conftest import FakeResponse, FakeSession
+from fetcher import AdaptiveConcurrency, BlockedError, Fetcher, TokenBucket
+
+URL = 'https://shop.test/dp/B000TEST01'
+THROTTLED = FakeResponse(503, b'<html>Service Unavailable</html>')
+OK = FakeResponse(200, b'<html>Monster Energy</html>')
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Retry delays the fetcher chose; nothing actually sleeps"""
+    delays = []
+    retry_delay = Fetcher.retry_delay
+
+    def recorded(self, attempt, response=None):
+        delays.append(retry_delay(self, attempt, response))
+        return delays[-1]
+
+    monkeypatch.setattr(Fetcher, 'retry_delay', recorded)
+    monkeypatch.setattr('fetcher.time.sleep', lambda seconds: None)
+    return delays
+
+
+def make_fetcher(responses, **kwargs):
+    options = dict(rate=100, burst=100, jitter=0, retries=2, backoff=2.0, max_backoff=60.0)
+    options.update(kwargs)
+    fetcher = Fetcher({}, **options)
+    fetcher.session = FakeSession(responses=responses)
+    return fetcher
+
+
+def test_throttled_responses_are_retried_with_backoff(sleeps):
+    fetcher = make_fetcher([THROTTLED, THROTTLED, OK])
+    page = fetcher.get(URL)
+    assert page.status_code == 200 and page.blocked is None
+    assert len(fetcher.session.requests) == 3
+    # 2s, then 4s, each with up to half taken off as jitter
+    assert 1.0 <= sleeps[0] <= 2.0 and 2.0 <= sleeps[1] <= 4.0
+
+
+def test_retry_after_is_honoured_up_to_max_backoff(sleeps):
+    fetcher = make_fetcher([
+        FakeResponse(503, b'', {'Retry-After': '30'}),
+        FakeResponse(429, b'', {'Retry-After': '600'}),
+        OK,
+    ])
+    fetcher.get(URL)
+    assert sleeps == [30.0, 60.0]
+
+
+def test_connection_errors_are_retried(sleeps):
+    fetcher = make_fetcher([requests.ConnectionError('reset'), OK])
+    assert fetcher.get(URL).status_code == 200
+    assert len(sleeps) == 1
+
+    fetcher = make_fetcher([requests.Timeout('slow')] * 3)
+    with pytest.raises(requests.Timeout):
+        fetcher.get(URL)
+
+
+def test_exhausted_retries_return_a_blocked_page(sleeps):
+    fetcher = make_fetcher([THROTTLED] * 3)
+    page = fetcher.get(URL)
+    assert page.blocked == 'http 503'
+    assert fetcher.breaker.consecutive == 1 and not fetcher.breaker.open
+
+
+def test_throttling_lowers_the_request_rate(sleeps):
+    fetcher = make_fetcher([THROTTLED, THROTTLED, OK], rate=4.0, burst=1)
+    fetcher.get(URL)
+    bucket = fetcher.bucket_for(URL)
+    # Halved twice, then a tenth of the configured rate back
+    assert bucket.rate == pytest.approx(4.0 / 4 + 0.4)
+    assert fetcher.concurrency.limit < fetcher.concurrency.maximum
+
+
+def test_token_bucket_rate_is_bounded(sleeps):
+    bucket = TokenBucket(rate=8.0, burst=4)
+    for _ in range(10):
+        bucket.record(throttled=True)
+    assert bucket.rate == 0.5  # 1/16 of the configured rate
+    assert bucket.tokens <= 0  # no saved-up burst right after a throttle
+    assert bucket.acquire() == pytest.approx(1 / 0.5, rel=0.05)  # the next request waits a full interval
+
+    for _ in range(20):
+        bucket.record(throttled=False)
+    assert bucket.rate == 8.0
+
+
+def test_concurrency_limit_halves_and_recovers():
+    concurrency = AdaptiveConcurrency(4)
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 2.0
+    for _ in range(10):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 4.0
+
+
+def test_breaker_opens_after_consecutive_blocked_fetches(sleeps):
+    fetcher = make_fetcher([THROTTLED, OK, THROTTLED, THROTTLED], retries=0, breaker_threshold=2)
+    assert fetcher.get(URL).blocked
+    assert fetcher.get(URL).blocked is None  # a fetch that gets through resets the count
+    assert fetcher.get(URL).blocked
+    assert not fetcher.breaker.open
+    assert fetcher.get(URL).blocked
+    assert fetcher.breaker.open and fetcher.breaker.reason == 'http 503'
+
+    with pytest.raises(BlockedError):
+        fetcher.get(URL)
+    assert len(fetcher.session.requests) == 4  # an open breaker doesn't touch the network
+
+    fetcher.breaker.reset()
+    fetcher.session.responses = [OK]
+    assert fetcher.get(URL).status_code == 200
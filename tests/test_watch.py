@@ -0,0 +1,100 @@
+import os
+import signal
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from conftest import REPO_DIR
+from storage import JsonHistoryStore
+
+# Watch mode against an in-process stand-in server; every product check is slow
+# enough that the signal arrives while a batch is being fetched and parsed
+WATCH_SCRIPT = textwrap.dedent(f"""
+    import sys
+    sys.path[:0] = [{REPO_DIR!r}, {os.path.join(REPO_DIR, 'bench')!r}]
+    from retailers import AmazonAdapter
+    from server import StandInRetailer, start_server
+    from tracker import MonsterDealTracker
+    from watch import Watcher
+
+    if __name__ == '__main__':
+        server, base_url = start_server(StandInRetailer(products=30, page_kb=(4,), latency=0.15))
+        adapter = AmazonAdapter(base_url=base_url)
+        adapter.requests_per_second = 20
+        adapter.request_jitter = 0
+        tracker = MonsterDealTracker(history_file='history.json', retailers=[adapter])
+        tracker.captures = None
+        tracker.parse_workers = 2
+        Watcher(tracker, checks_per_hour=3600).run()
+""")
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'killpg'), reason='needs POSIX process groups')
+
+
+def parse_workers(pgid):
+    """Pids of the forkserver's children in a process group (Linux /proc)"""
+    workers = []
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                ppid, pgrp = (int(field) for field in f.read().rsplit(')', 1)[1].split()[1:3])
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except (OSError, ValueError):
+            continue
+        if pgrp == pgid and ppid != pgid and b'forkserver' in cmdline:
+            workers.append(int(pid))
+    return workers
+
+
+def run_watch(tmp_path, during_batch):
+    """Start watch mode in its own process group, call during_batch(pid) once results come in,
+    then wait for it to exit; returns (return code, log lines)"""
+    (tmp_path / 'watch_run.py').write_text(WATCH_SCRIPT)
+    log_path = tmp_path / 'watch.log'
+    with open(log_path, 'w') as log:
+        # Its own process group, like a terminal's foreground job
+        process = subprocess.Popen([sys.executable, 'watch_run.py'], cwd=tmp_path, stdout=log,
+                                   stderr=subprocess.STDOUT, start_new_session=True)
+    try:
+        deadline = time.monotonic() + 60
+        while '/oz - ' not in log_path.read_text() and process.poll() is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+        during_batch(process.pid)
+        process.wait(timeout=120)
+    finally:
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+    return process.returncode, log_path.read_text().splitlines()
+
+
+def assert_batch_saved(tmp_path, returncode, lines):
+    log = '\n'.join(lines)
+    assert returncode == 0, log
+    assert 'Watch mode stopped' in log
+    checked = [line for line in lines if '/oz - ' in line and '•' not in line]  # leaving out deal alerts
+    saved = JsonHistoryStore(str(tmp_path / 'history.json')).load()
+    assert len(saved) == len(checked) > 0, log
+
+
+@pytest.mark.parametrize('signum', [signal.SIGINT, signal.SIGTERM], ids=['SIGINT', 'SIGTERM'])
+def test_stop_signal_to_the_process_group_saves_the_batch(tmp_path, signum):
+    returncode, lines = run_watch(tmp_path, lambda pid: os.killpg(pid, signum))
+    assert_batch_saved(tmp_path, returncode, lines)
+    assert not any('Parse workers stopped' in line for line in lines)
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason='finds the parse workers through /proc')
+def test_dead_parse_worker_falls_back_to_inline_parsing(tmp_path):
+    def kill_a_worker(pid):
+        os.kill(parse_workers(pid)[0], signal.SIGKILL)
+        time.sleep(3)  # the rest of the batch is parsed inline
+        os.killpg(pid, signal.SIGTERM)
+
+    returncode, lines = run_watch(tmp_path, kill_a_worker)
+    assert_batch_saved(tmp_path, returncode, lines)
+    assert any('Parse workers stopped' in line for line in lines)
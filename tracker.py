@@ -1,16 +1,44 @@
-import requests
-import json
+import argparse
+import multiprocessing
 import os
-import re
-import random
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from bs4 import BeautifulSoup
-import time
+from fetcher import BlockedError, Fetcher, ResponseCache
+from captures import CaptureStore
+from storage import open_store, SummaryIndex
+from observation import Observation
+from catalog import AsinCatalog
+from metrics import RunMetrics, profiled
+from analytics import PriceTrends, describe_price
+from extraction import find_fluid_oz, PackSizeCache
+from retailers import AmazonAdapter, RETAILERS
+from watch import Watcher
+
+STOP_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+def _ignore_stop_signals():
+    """Parse worker initializer: Ctrl+C/SIGTERM to the process group are the parent's to handle"""
+    for signum in STOP_SIGNALS:
+        signal.signal(signum, signal.SIG_IGN)
+
+def _kill_workers(pool):
+    """SIGKILL a broken pool's workers (they ignore the SIGTERM its own cleanup sends)"""
+    for process in list((pool._processes or {}).values()):
+        process.kill()
 
 class MonsterDealTracker:
-    def __init__(self):
+    def __init__(self, history_file='price_history.json', retailers=None):
         self.price_threshold = 0.12  # $/fl oz
+        self.history_file = history_file
         self.results = []
+        # (retailer, asin, timestamp) of results read from cached pages: they
+        # go in the report but were saved to the history when first fetched
+        self.replayed = set()
+        self.metrics = RunMetrics()
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -19,387 +47,581 @@ class MonsterDealTracker:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         }
+        # Responses are cached on disk so reruns don't re-download recent pages;
+        # each retailer adds TTL rules for its search and product pages
+        self.cache_dir = '.tracker_cache'
+        self.http_cache = ResponseCache(os.path.join(self.cache_dir, 'http'), default_ttl=2 * 3600)
+        self.discovery_interval = 4  # runs between full search crawls
+        self.max_valid_products = 20  # valid products checked per run, per retailer
+        # Product pages are parsed in worker processes while fetching continues
+        self.parse_workers = os.cpu_count() or 1  # 0 parses inline
+        self.parse_pool = None
+        self.prescreen_margin = 0.25  # fetch if estimated $/oz <= threshold * (1 + margin)
+        # Cached product pages older than this are revalidated even within their
+        # TTL (None: just the TTL). Watch mode sets 0 so every check is current
+        self.product_max_age = None
+        # Every page fetched over the network is archived (compressed and
+        # deduplicated) for replay and parser debugging; None disables it
+        self.captures = CaptureStore(os.path.join(self.cache_dir, 'captures'))
+        # Watch mode keeps the history store and summary index open between saves
+        self.history_store = None
+        self.summary_index = None
+        
+        # Per-retailer state, keyed by adapter.key. Each retailer has its own
+        # fetcher (politeness budget, AIMD limit and circuit breaker), catalog
+        # of known products, pack-size cache and search cards from this run.
+        self.retailers = []
+        self.fetchers = {}
+        self.catalogs = {}
+        self.pack_sizes = {}
+        self.search_cards = {}
+        for adapter in retailers or [AmazonAdapter()]:
+            self.add_retailer(adapter)
+    
+    def add_retailer(self, adapter):
+        """Register a retailer adapter and set up its fetcher and caches"""
+        self.retailers.append(adapter)
+        self.http_cache.ttl_rules.extend(adapter.ttl_rules())
+        state_dir = os.path.join(self.cache_dir, adapter.state_key)
+        self.fetchers[adapter.key] = Fetcher(
+            self.headers,
+            max_workers=adapter.max_workers,
+            rate=adapter.requests_per_second,
+            burst=adapter.request_burst,
+            jitter=adapter.request_jitter,
+            cache=self.http_cache,
+            metrics=self.metrics,
+        )
+        # Known products are checked most-promising-first; search re-discovery
+        # only happens every few runs
+        self.catalogs[adapter.key] = AsinCatalog(os.path.join(state_dir, 'catalog.json'))
+        # Pack sizes rarely change, so they're remembered per product across runs
+        self.pack_sizes[adapter.key] = PackSizeCache(os.path.join(state_dir, 'pack_sizes.json'))
+        # Search result cards let us skip product pages that are clearly too
+        # expensive or not Monster
+        self.search_cards[adapter.key] = {}
     
-    def search_amazon_monsters(self, max_pages=3):
-        """Search Amazon for Monster Energy drinks and extract all products"""
-        print("\n🔍 Searching Amazon for Monster Energy drinks...")
+    def search(self, adapter, max_pages=3):
+        """Search a retailer for Monster Energy drinks and extract all products
         
-        all_asins = set()
+        Each card's title/price/fl oz is kept in self.search_cards, for the
+        catalog's pre-screening verdicts.
+        """
+        print(f"\n🔍 Searching {adapter.name} for Monster Energy drinks...")
         
-        for page in range(1, max_pages + 1):
-            url = f"https://www.amazon.com/s?k=monster+energy+drink&page={page}"
-            
+        fetcher = self.fetchers[adapter.key]
+        cards_seen = {}
+        all_asins = []
+        
+        def fetch_page(page):
+            try:
+                return page, fetcher.get(adapter.search_url(page)), None
+            except Exception as e:
+                return page, None, e
+        
+        for page, response, error in fetcher.map(fetch_page, range(1, max_pages + 1)):
             try:
-                time.sleep(random.uniform(2, 4))  # Random delay between pages
-                response = requests.get(url, headers=self.headers, timeout=15)
+                if error:
+                    raise error
+                
+                self.capture(adapter, response, kind='search')
+                if response.blocked:
+                    print(f"  Page {page}: Throttled ({response.blocked}) even after retries, skipping")
+                    continue
                 
                 if response.status_code != 200:
                     print(f"  Page {page}: Status {response.status_code}, skipping")
                     continue
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
                 # Find all product cards
-                products = soup.find_all('div', {'data-component-type': 's-search-result'})
+                with self.metrics.stage('search_parse'):
+                    cards = adapter.parse_search(response.content)
                 
-                if not products:
-                    print(f"  Page {page}: No products found (Amazon may have changed layout)")
+                if not cards:
+                    print(f"  Page {page}: No products found ({adapter.name} may have changed layout)")
                     break
                 
                 page_asins = 0
-                for product in products:
-                    # Extract ASIN from data-asin attribute
-                    asin = product.get('data-asin')
-                    if asin and asin not in all_asins:
-                        all_asins.add(asin)
+                for card in cards:
+                    if card['asin'] not in cards_seen:
+                        cards_seen[card['asin']] = card
+                        all_asins.append(card['asin'])
                         page_asins += 1
                 
                 print(f"  Page {page}: Found {page_asins} products")
                 
+            except BlockedError as e:
+                print(f"  Page {page}: 🛑 {e} - stopping search")
+                break
             except Exception as e:
                 print(f"  Page {page}: Error - {e}")
-                break
         
-        print(f"\n📦 Total unique products found: {len(all_asins)}")
-        return list(all_asins)
+        self.search_cards[adapter.key] = cards_seen
+        print(f"\n📦 Total unique {adapter.name} products found: {len(all_asins)}")
+        return all_asins
     
-    def check_amazon_product(self, asin, save_debug=False):
-        """Check a specific Amazon product by ASIN"""
-        url = f"https://www.amazon.com/dp/{asin}"
+    def prescreen(self, adapter, asins):
+        """Drop products whose search card already rules them out
+        
+        A product page is still fetched when the card's estimated $/oz is within
+        prescreen_margin of the threshold, when the card couldn't be parsed, and
+        once the card is older than the retailer's search_page_ttl, so a price
+        drop since the crawl isn't missed.
+        """
+        catalog = self.catalogs[adapter.key]
+        candidates = []
+        limit = self.price_threshold * (1 + self.prescreen_margin)
+        for asin in asins:
+            card = catalog.card(asin, adapter.search_page_ttl)
+            if card is None or not card['title']:
+                self.metrics.count('prescreen', 'no card')
+                candidates.append(asin)
+            elif 'monster' not in card['title'].lower():
+                self.metrics.count('prescreen', 'skipped (not Monster)')
+                catalog.record_skip(asin)
+            elif card['price_per_oz'] is None:
+                self.metrics.count('prescreen', 'unparsed card')
+                candidates.append(asin)
+            elif card['fl_oz'] < 64 or card['price_per_oz'] > limit:
+                self.metrics.count('prescreen', 'skipped (price)')
+                catalog.record_skip(asin)
+            else:
+                self.metrics.count('prescreen', 'fetch')
+                candidates.append(asin)
+        
+        skipped = len(asins) - len(candidates)
+        if skipped:
+            print(f"  🧮 Pre-screened out {skipped} {adapter.name} product(s) from search cards (estimated $/oz above ${limit:.3f})")
+        return candidates
+    
+    def fetch_product_page(self, adapter, asin, save_debug=False):
+        """Fetch a product page, returning None unless it loaded (status 200)
+        
+        Raises BlockedError if the retailer kept throttling the request, so a
+        block isn't mistaken for a missing product.
+        """
+        with self.metrics.stage('product_fetch'):
+            response = self.fetchers[adapter.key].get(adapter.product_url(asin), max_age=self.product_max_age)
+        
+        digest = self.capture(adapter, response, asin)
+        if digest and save_debug:
+            print(f"  💾 Captured {asin} ({digest[:12]}) - python captures.py extract {self.captures.directory} {asin} {asin}.html")
         
+        if response.blocked:
+            raise BlockedError(response.blocked)
+        if response.status_code != 200:
+            return None
+        
+        return response
+    
+    def capture(self, adapter, response, asin=None, kind='product'):
+        """Archive a page fetched over the network, returning its content hash"""
+        if self.captures is None or response.from_cache:
+            return None
+        with self.metrics.stage('capture'):
+            return self.captures.add(response.url, response.status_code, response.content,
+                                     asin=asin, retailer=adapter.name, kind=kind)
+    
+    def check_product(self, adapter, asin, save_debug=False):
+        """Check a single product by its retailer product ID (ASIN for Amazon)"""
         try:
-            time.sleep(random.uniform(3, 7))  # Random delay 3-7 seconds
-            response = requests.get(url, headers=self.headers, timeout=15)
-            
-            if response.status_code != 200:
+            response = self.fetch_product_page(adapter, asin, save_debug)
+            if response is None:
                 return None
+            fields = adapter.parse_product(response.content, asin, self.pack_sizes[adapter.key].entry(asin), save_debug)
+            return self.build_result(adapter, asin, fields, save_debug, response)
+        except Exception as e:
+            return None
+    
+    def build_result(self, adapter, asin, fields, save_debug=False, page=None):
+        """Turn extracted page fields into a result (or None if the product doesn't qualify)
+        
+        The result is timestamped with when the page was fetched, which for a
+        cache hit is when it was first downloaded.
+        """
+        for stage, seconds in fields['timings'].items():
+            self.metrics.add_time(stage, seconds)
+        
+        title = fields['title']
+        availability = fields['availability']
+        
+        # Check if product is actually available for purchase
+        if availability == "Out of Stock":
+            print(f"  ⚠️  SKIPPED (out of stock): {title[:50] if title else asin}...")
+            return None
+        
+        # Skip if title not found
+        if not title:
+            return None
+        
+        # Skip non-Monster products (sometimes search returns related items)
+        if 'monster' not in title.lower():
+            return None
+        
+        # Extract price - ONLY for THIS specific ASIN, not related products
+        price = None
+        seller_info = None
+        prices_found = [tuple(found) for found in fields['prices']]
+        
+        # Choose the CHEAPEST price found, but prefer in-stock items
+        if prices_found:
+            prices_found.sort(key=lambda x: x[1])  # Sort by price
+            price_source, price, seller_info = prices_found[0]
+            self.metrics.count('price_method', price_source)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Additional check: if availability is unknown/questionable, note it
+            is_reliable = availability == "In Stock" or adapter.is_first_party(seller_info)
             
-            # Save debug HTML if requested (for troubleshooting)
             if save_debug:
-                debug_dir = 'debug_html'
-                os.makedirs(debug_dir, exist_ok=True)
-                with open(f'{debug_dir}/{asin}.html', 'w', encoding='utf-8') as f:
-                    f.write(response.text)
-                print(f"  💾 Saved debug HTML to debug_html/{asin}.html")
-            
-            # Extract title
-            title = None
-            title_elem = soup.find('span', {'id': 'productTitle'})
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-            
-            # Check if product is actually available for purchase
-            availability = "Unknown"
-            availability_elem = soup.find('div', {'id': 'availability'})
-            if availability_elem:
-                avail_text = availability_elem.get_text(strip=True).lower()
-                if 'in stock' in avail_text or 'available' in avail_text:
-                    availability = "In Stock"
-                elif 'out of stock' in avail_text or 'unavailable' in avail_text:
-                    availability = "Out of Stock"
-                    print(f"  ⚠️  SKIPPED (out of stock): {title[:50] if title else asin}...")
-                    return None
-                elif 'see all buying options' in avail_text:
-                    availability = "Third-party only"
-            
-            # Skip if title not found
-            if not title:
-                return None
-            
-            # Skip non-Monster products (sometimes search returns related items)
-            if 'monster' not in title.lower():
-                return None
-            
-            # Extract price - ONLY for THIS specific ASIN, not related products
-            price = None
-            seller_info = None
-            prices_found = []
-            
+                print(f"    ✓ Selected: ${price:.2f} from {price_source} ({seller_info})")
+                print(f"    All prices found: {[f'${p[1]:.2f}' for p in prices_found]}")
+                if not is_reliable:
+                    print(f"    ⚠️  Warning: Availability questionable for this price")
+        
+        if not price:
             if save_debug:
-                print(f"\n  🔍 DEBUG MODE for {asin}:")
-            
-            # CRITICAL: Find the MAIN product info section that belongs to THIS ASIN only
-            # Exclude all recommendation carousels and "Consider these alternatives"
-            
-            # Method 1: Buy box in the right column (most reliable for the actual product)
-            buy_box_section = soup.find('div', {'id': 'rightCol'})
-            if not buy_box_section:
-                buy_box_section = soup.find('div', {'id': 'apex_desktop'})
-            
-            if buy_box_section:
-                # Make sure we're not in a carousel by checking for carousel markers
-                parent_text = str(buy_box_section.parent) if buy_box_section.parent else ""
-                is_in_carousel = any(marker in parent_text for marker in ['carousel', 'faceout', 'alternative'])
-                
-                if not is_in_carousel:
-                    price_whole = buy_box_section.find('span', class_='a-price-whole')
-                    price_fraction = buy_box_section.find('span', class_='a-price-fraction')
-                    
-                    if price_whole:
-                        price_str = price_whole.get_text(strip=True).replace(',', '').replace('.', '')
-                        if price_fraction:
-                            price_str += '.' + price_fraction.get_text(strip=True)
-                        try:
-                            buybox_price = float(price_str)
-                            
-                            # Filter out unit prices
-                            if buybox_price >= 5.0:
-                                price_context = buy_box_section.get_text(strip=True).lower()
-                                if 'subscribe' in price_context or 'subscription' in price_context:
-                                    if save_debug:
-                                        print(f"    - Buy Box: ${buybox_price:.2f} (Subscribe & Save)")
-                                    prices_found.append(('Buy Box (S&S)', buybox_price, 'Subscribe & Save'))
-                                else:
-                                    prices_found.append(('Buy Box', buybox_price, 'Main listing'))
-                                    if save_debug:
-                                        print(f"    - Buy Box: ${buybox_price:.2f}")
-                            elif save_debug:
-                                print(f"    - Buy Box: ${buybox_price:.2f} (SKIPPED - likely unit price)")
-                        except Exception as e:
-                            if save_debug:
-                                print(f"    - Buy Box parse error: {e}")
-            
-            # Method 2: Check "Other Sellers" section for cheaper alternatives
-            other_sellers = soup.find('div', {'id': 'aod-offer-list'})
-            if other_sellers:
-                offers = other_sellers.find_all('div', {'id': re.compile(r'aod-offer-')})
-                if save_debug:
-                    print(f"    - Found {len(offers)} other seller offers")
-                    
-                for i, offer in enumerate(offers[:10]):  # Check up to 10 offers
-                    try:
-                        offer_price_elem = offer.find('span', class_='a-offscreen')
-                        if offer_price_elem:
-                            offer_price_text = offer_price_elem.get_text(strip=True)
-                            offer_price_match = re.search(r'\$?([\d,]+\.?\d*)', offer_price_text)
-                            if offer_price_match:
-                                offer_price = float(offer_price_match.group(1).replace(',', ''))
-                                
-                                # Filter out unit prices
-                                if offer_price < 5.0:
-                                    if save_debug:
-                                        print(f"    - Offer {i+1}: ${offer_price:.2f} (SKIPPED - likely unit price)")
-                                    continue
-                                
-                                # Try to get seller name
-                                seller_name_elem = offer.find('div', {'id': re.compile(r'aod-offer-soldBy-')})
-                                seller_name = seller_name_elem.get_text(strip=True) if seller_name_elem else 'Third-party'
-                                
-                                prices_found.append(('Other Seller', offer_price, seller_name))
-                                if save_debug:
-                                    print(f"    - Offer {i+1}: ${offer_price:.2f} from {seller_name}")
-                    except Exception as e:
-                        if save_debug:
-                            print(f"    - Offer {i+1} parse error: {e}")
-            
-            # Method 3: Look for price ONLY in product-specific sections
-            # Exclude any div that has "faceout", "carousel", or "alternative" in its attributes
-            if not prices_found:
-                # Find price elements but validate they're not in recommendation sections
-                all_price_sections = soup.find_all('div', class_=re.compile(r'a-section.*'))
-                
-                for section in all_price_sections:
-                    # Skip if this section is part of a carousel or alternatives
-                    section_html = str(section)
-                    if any(skip_word in section_html.lower() for skip_word in ['carousel', 'faceout', 'alternative', 'data-asin', 'consider these']):
-                        continue
-                    
-                    # Look for price in this clean section
-                    price_elem = section.find('span', class_='a-offscreen')
-                    if price_elem:
-                        price_text = price_elem.get_text(strip=True)
-                        price_match = re.search(r'\$?([\d,]+\.?\d*)', price_text)
-                        if price_match:
-                            try:
-                                section_price = float(price_match.group(1).replace(',', ''))
-                                
-                                if section_price >= 5.0 and section_price <= 100.0:
-                                    prices_found.append(('Section scan', section_price, 'Unknown'))
-                                    if save_debug:
-                                        print(f"    - Section price: ${section_price:.2f}")
-                                    break  # Take first valid price
-                            except:
-                                pass
-                
-                if save_debug and not prices_found:
-                    print(f"    - No valid prices found in clean sections")
-            
-            # Choose the CHEAPEST price found, but prefer in-stock items
-            if prices_found:
-                prices_found.sort(key=lambda x: x[1])  # Sort by price
-                price_source, price, seller_info = prices_found[0]
-                
-                # Additional check: if availability is unknown/questionable, note it
-                is_reliable = (availability == "In Stock" or 'Main listing' in seller_info or 'amazon' in seller_info.lower())
-                
-                if save_debug:
-                    print(f"    ✓ Selected: ${price:.2f} from {price_source} ({seller_info})")
-                    print(f"    All prices found: {[f'${p[1]:.2f}' for p in prices_found]}")
-                    if not is_reliable:
-                        print(f"    ⚠️  Warning: Availability questionable for this price")
-            
-            if not price:
-                if save_debug:
-                    print(f"    ✗ No price found")
-                return None
-            
-            # Extract fluid oz from title and product details
-            fl_oz = self.extract_fluid_oz_advanced(title, soup)
-            
-            if not fl_oz:
-                return None
-            
-            # Skip if unreasonably small (single cans, etc.) - focus on bulk deals
-            if fl_oz < 64:  # Less than 4 cans worth
-                return None
-            
-            price_per_oz = price / fl_oz
-            
-            result = {
-                'retailer': 'Amazon',
-                'asin': asin,
-                'title': title,
-                'price': price,
-                'fl_oz': fl_oz,
-                'price_per_oz': round(price_per_oz, 4),
-                'link': f"https://www.amazon.com/dp/{asin}",
-                'seller_info': seller_info if seller_info else 'Amazon/Unknown',
-                'availability': availability,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Show what we found with availability warning
-            status = "⭐ DEAL" if price_per_oz <= self.price_threshold else "  "
-            avail_icon = "✅" if availability == "In Stock" else "⚠️ "
-            print(f"  {status} {avail_icon} ${price_per_oz:.4f}/oz - {title[:60]}...")
-            
-            return result
-            
-        except Exception as e:
+                print(f"    ✗ No price found")
             return None
-    
-    def check_amazon(self):
-        """Search Amazon and check all Monster Energy products"""
-        # First, search to get ASINs
-        asins = self.search_amazon_monsters(max_pages=3)
         
-        if not asins:
-            print("⚠️  No products found in search")
-            return
+        # Fluid oz come from the title and product details, or the pack-size
+        # cache for known products
+        fl_oz = fields['fl_oz']
+        if fl_oz and fields['fl_oz_source'] != 'cache':
+            self.pack_sizes[adapter.key].put(asin, title, fl_oz, fields['fl_oz_source'])
         
-        print(f"\n🔎 Checking prices for {len(asins)} products...")
-        print("=" * 70)
+        if not fl_oz:
+            return None
         
-        checked = 0
-        for i, asin in enumerate(asins):
-            # Enable debug for first 3 products to see what's happening
-            save_debug = (i < 3)
-            result = self.check_amazon_product(asin, save_debug=save_debug)
-            if result:
-                self.results.append(result)
-                checked += 1
-            
-            # Limit to avoid excessive requests
-            if checked >= 20:
-                print(f"\n  (Limited to first 20 valid products to avoid rate limiting)")
-                break
+        # Skip if unreasonably small (single cans, etc.) - focus on bulk deals
+        if fl_oz < 64:  # Less than 4 cans worth
+            return None
+        
+        price_per_oz = price / fl_oz
+        
+        result = Observation(
+            retailer=adapter.name,
+            asin=asin,
+            title=title,
+            price=price,
+            fl_oz=fl_oz,
+            price_per_oz=round(price_per_oz, 4),
+            seller_info=seller_info if seller_info else f'{adapter.name}/Unknown',
+            availability=availability,
+            timestamp=datetime.fromtimestamp(page.fetched_at).isoformat() if page else datetime.now().isoformat(),
+        )
+        if page is not None and page.from_cache:
+            self.replayed.add((result.retailer, result.asin, result.timestamp))
+        
+        # Show what we found with availability warning
+        status = "⭐ DEAL" if price_per_oz <= self.price_threshold else "  "
+        avail_icon = "✅" if availability == "In Stock" else "⚠️ "
+        print(f"  {status} {avail_icon} ${price_per_oz:.4f}/oz - {title[:60]}...")
+        
+        return result
+    
+    def check_retailers(self):
+        """Check every retailer at once; each is a separate host with its own rate limits
+        
+        Results are kept in retailer order, so the run's output doesn't depend
+        on which retailer finishes first.
+        """
+        self.start_parse_pool()
+        try:
+            with ThreadPoolExecutor(max_workers=len(self.retailers)) as executor:
+                checks = [executor.submit(self.check_retailer, adapter) for adapter in self.retailers]
+                for adapter, check in zip(self.retailers, checks):
+                    try:
+                        self.results.extend(check.result())
+                    except Exception as e:
+                        print(f"⚠️  {adapter.name}: check failed - {e}")
+        finally:
+            self.stop_parse_pool()
+        
+        blocked = [f"{adapter.name} {self.fetchers[adapter.key].breaker.describe()}"
+                   for adapter in self.retailers if self.fetchers[adapter.key].breaker.open]
+        if blocked:
+            self.metrics.status = '; '.join(blocked)
         
         print("=" * 70)
         print(f"✓ Successfully checked {len(self.results)} products")
+        for stat, value in self.http_cache.stats.items():
+            self.metrics.incr(f'cache_{stat}', value)
+        print(f"🗄️  HTTP cache: {self.http_cache.summary()}")
+        if self.captures is not None:
+            dropped, _ = self.captures.prune()
+            for stat, value in self.captures.stats.items():
+                self.metrics.incr(f'captures_{stat}', value)
+            print(f"🗃️  Captures: {self.captures.summary()}" + (f", {dropped} old captures pruned" if dropped else ""))
     
-    def extract_fluid_oz_advanced(self, title, soup):
-        """Extract fluid ounces from title and product details"""
-        # First try title
-        fl_oz = self.extract_fluid_oz(title)
-        if fl_oz:
-            return fl_oz
+    def check_retailer(self, adapter):
+        """Check a retailer's known products, re-discovering via search every few runs"""
+        with self.metrics.stage(f'retailer_{adapter.key}'):
+            return self.check_known_products(adapter)
+    
+    def check_known_products(self, adapter):
+        """Search (if due), pre-screen and check one retailer's products, returning its results"""
+        catalog = self.catalogs[adapter.key]
+        catalog.start_run()
+        if not catalog.products and os.path.exists(self.history_file):
+            store = open_store(self.history_file)
+            try:
+                catalog.seed_from_history(r for r in store.records() if r.retailer == adapter.name)
+            finally:
+                store.close()
         
-        # Try product details table
-        try:
-            details = soup.find('div', {'id': 'detailBullets_feature_div'})
-            if details:
-                text = details.get_text()
-                fl_oz = self.extract_fluid_oz(text)
-                if fl_oz:
-                    return fl_oz
-            
-            # Try technical details
-            tech_details = soup.find('table', {'id': 'productDetails_techSpec_section_1'})
-            if tech_details:
-                text = tech_details.get_text()
-                fl_oz = self.extract_fluid_oz(text)
-                if fl_oz:
-                    return fl_oz
-        except:
-            pass
+        if catalog.needs_discovery(self.discovery_interval):
+            with self.metrics.stage('search'):
+                found = self.search(adapter, max_pages=3)
+            new = catalog.add_discovered(found, self.search_cards[adapter.key])
+            print(f"  📇 {new} new {adapter.name} product(s) added to the catalog")
+        else:
+            print(f"\n📇 Using {len(catalog.products)} known {adapter.name} products (search re-discovery every {self.discovery_interval} runs)")
         
-        return None
+        # Stalest, most volatile and closest-to-threshold products first
+        asins = self.prescreen(adapter, catalog.prioritized(self.price_threshold))
+        
+        if not asins:
+            print(f"⚠️  No {adapter.name} products found in search")
+            catalog.save()
+            return []
+        
+        print(f"\n🔎 Checking prices for {len(asins)} {adapter.name} products...")
+        print("=" * 70)
+        
+        results = self.check_products(adapter, asins, self.max_valid_products)
+        self.pack_sizes[adapter.key].save()
+        catalog.save()
+        return results
     
-    def extract_fluid_oz(self, text):
-        """Extract fluid ounces from text"""
-        if not text:
-            return None
-            
-        text_lower = text.lower()
-        
-        # Patterns to match (order matters - most specific first)
-        patterns = [
-            # "16 Ounce (Pack of 15)"
-            r'(\d+\.?\d*)\s*ounce\s*\(pack\s+of\s+(\d+)\)',
-            # "16 Fl Oz (Pack of 24)"
-            r'(\d+\.?\d*)\s*fl\.?\s*oz\.?\s*\(pack\s+of\s+(\d+)\)',
-            # "24 Pack, 16 Fl Oz"
-            r'(\d+)\s*pack[,\s]+(\d+\.?\d*)\s*fl\.?\s*oz',
-            # "Pack of 24, 16 oz"
-            r'pack\s+of\s+(\d+)[,\s]+(\d+\.?\d*)\s*(?:fl\.?\s*)?oz',
-            # "24 x 16 fl oz"
-            r'(\d+)\s*x\s*(\d+\.?\d*)\s*fl\.?\s*oz',
-            # "(24 Count) 16 oz"
-            r'\((\d+)\s*count\)[,\s]*(\d+\.?\d*)\s*(?:fl\.?\s*)?oz',
-            # "24-Pack 16 oz"
-            r'(\d+)-pack\s+(\d+\.?\d*)\s*oz',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text_lower)
-            if match:
+    def check_products(self, adapter, asins, limit, debug_first=3):
+        """Fetch and parse products in the given order until `limit` valid ones are found"""
+        fetcher = self.fetchers[adapter.key]
+        catalog = self.catalogs[adapter.key]
+        results = []
+        
+        def fetch(item):
+            i, asin = item
+            save_debug = i < debug_first
+            try:
+                # Enable debug for the first few products to see what's happening
+                return asin, save_debug, self.fetch_product_page(adapter, asin, save_debug=save_debug), False
+            except BlockedError:
+                return asin, save_debug, None, True
+            except Exception:
+                return asin, save_debug, None, False
+        
+        def collect(asin, save_debug, parsed, page):
+            try:
                 try:
-                    num1 = float(match.group(1))
-                    num2 = float(match.group(2))
-                    # Calculate total fluid oz
-                    total = num1 * num2
-                    return total
-                except:
-                    continue
+                    fields = parsed.result() if parsed else None
+                except BrokenProcessPool:
+                    self.parse_pool_broken()
+                    fields = self.submit_parse(adapter, asin, page.content, save_debug).result()
+                result = self.build_result(adapter, asin, fields, save_debug, page) if fields else None
+            except Exception:
+                result = None
+            catalog.record_check(asin, result.price_per_oz if result else None)
+            self.metrics.incr('products_checked')
+            if result:
+                results.append(result)
+            return result
         
+        # Fetch threads keep downloading while worker processes parse finished
+        # pages. Parsed pages are collected strictly in priority order, so the
+        # cap counts the same products it would if everything ran serially.
+        checked = 0
+        backlog = 2 * self.parse_workers + adapter.max_workers  # parsed pages queued before waiting
+        pending = deque()  # (asin, save_debug, parse future, page) in priority order
+        fetched = fetcher.map(fetch, enumerate(asins))
+        try:
+            with self.metrics.stage('product_checks'):
+                for asin, save_debug, response, blocked in fetched:
+                    if blocked:
+                        # Not a miss - leave the product stale so it's checked first next run
+                        self.metrics.incr('products_blocked')
+                        if fetcher.breaker.open:
+                            print(f"\n  🛑 {adapter.name} is {fetcher.breaker.describe()} - ending its checks early")
+                            break
+                        continue
+                    
+                    parsed = self.submit_parse(adapter, asin, response.content, save_debug) if response is not None else None
+                    pending.append((asin, save_debug, parsed, response))
+                    
+                    # Collect whatever is ready; wait on the oldest once the backlog is full
+                    while pending and checked < limit:
+                        parsed = pending[0][2]
+                        if parsed is not None and not parsed.done() and len(pending) <= backlog:
+                            break
+                        if collect(*pending.popleft()):
+                            checked += 1
+                    
+                    if checked >= limit:
+                        break
+                
+                while pending and checked < limit:
+                    if collect(*pending.popleft()):
+                        checked += 1
+                
+                # Limit to avoid excessive requests
+                if checked >= limit:
+                    print(f"\n  (Limited to first {limit} valid {adapter.name} products to avoid rate limiting)")
+        finally:
+            fetched.close()  # cancels fetches that haven't started yet
+            for _, _, parsed, _ in pending:
+                if parsed is not None:
+                    parsed.cancel()
+        self.metrics.incr('valid_products', checked)
+        return results
+    
+    def keep_history_open(self):
+        """Hold the history store and summary index in memory across saves (watch mode)"""
+        self.history_store = open_store(self.history_file)
+        self.summary_index = SummaryIndex(SummaryIndex.path_for(self.history_file))
+    
+    def close(self):
+        """Close every retailer's session (persists the shared HTTP cache index)"""
+        for fetcher in self.fetchers.values():
+            fetcher.close()
+        if self.history_store is not None:
+            self.history_store.close()
+            self.history_store = None
+    
+    def start_parse_pool(self):
+        """Start the worker processes that parse product pages (if enabled)"""
+        if self.parse_workers and self.parse_pool is None:
+            # forkserver/spawn: forking while fetch threads hold locks isn't safe
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            # Workers ignore stop signals, so Ctrl+C or SIGTERM sent to the whole
+            # process group (terminal, timeout, systemd) doesn't kill them in the
+            # middle of a batch. The forkserver needs the same, or losing it
+            # breaks the pool: an ignored signal stays ignored across fork and
+            # exec, so they're ignored while it starts (and blocked, so one that
+            # arrives meanwhile is only delivered late)
+            protect = (context.get_start_method() == 'forkserver'
+                       and threading.current_thread() is threading.main_thread())
+            if protect:
+                blocked = signal.pthread_sigmask(signal.SIG_BLOCK, STOP_SIGNALS)
+                handlers = {signum: signal.signal(signum, signal.SIG_IGN) for signum in STOP_SIGNALS}
+            try:
+                self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context,
+                                                      initializer=_ignore_stop_signals)
+                self.parse_pool.submit(int)  # start the workers now, while we search/fetch
+            finally:
+                if protect:
+                    for signum, handler in handlers.items():
+                        signal.signal(signum, handler)
+                    signal.pthread_sigmask(signal.SIG_SETMASK, blocked)
+    
+    def stop_parse_pool(self):
+        if self.parse_pool is not None:
+            if self.parse_pool._broken:
+                _kill_workers(self.parse_pool)
+            self.parse_pool.shutdown(wait=True, cancel_futures=True)
+            self.parse_pool = None
+    
+    def parse_pool_broken(self):
+        """A worker died (killed, out of memory): parse inline for the rest of the run"""
+        pool, self.parse_pool = self.parse_pool, None
+        if pool is not None:
+            print("  ⚠️  Parse workers stopped - parsing inline from here on")
+            self.metrics.incr('parse_pool_broken')
+            _kill_workers(pool)
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def submit_parse(self, adapter, asin, content, save_debug=False):
+        """Parse a product page in the worker pool (or inline if there is none)"""
+        args = (content, asin, self.pack_sizes[adapter.key].entry(asin), save_debug)
+        pool = self.parse_pool
+        if pool is not None:
+            try:
+                return pool.submit(adapter.parse_product, *args)
+            except BrokenProcessPool:
+                self.parse_pool_broken()
+        parsed = Future()
+        try:
+            parsed.set_result(adapter.parse_product(*args))
+        except Exception as e:
+            parsed.set_exception(e)
+        return parsed
+    
+    def extract_fluid_oz_advanced(self, title, doc):
+        """Extract fluid ounces from title and product details"""
+        return self.find_fluid_oz(title, doc)[0]
+    
+    def find_fluid_oz(self, title, doc):
+        """Extract fluid ounces and where they were found: (fl_oz, source)"""
+        return find_fluid_oz(title, doc)
+    
+    def product_link(self, result):
+        """URL of a result's product page, from the adapter that checked it"""
+        for adapter in self.retailers:
+            if adapter.name == result.retailer:
+                return adapter.product_url(result.asin)
         return None
     
-    def save_results(self, filename='price_history.json'):
-        """Save results to JSON file"""
-        history = []
-        if os.path.exists(filename):
-            with open(filename, 'r') as f:
-                try:
-                    history = json.load(f)
-                except:
-                    history = []
-        
-        history.extend(self.results)
-        
-        with open(filename, 'w') as f:
-            json.dump(history, f, indent=2)
+    def save_results(self, filename=None):
+        """Save results to the price history (JSON file or SQLite database)"""
+        filename = filename or self.history_file
+        keep_open = self.history_store is not None and filename == self.history_file
+        new = [r for r in self.results if (r.retailer, r.asin, r.timestamp) not in self.replayed]
+        with self.metrics.stage('save'):
+            summary = self.summary_index if keep_open else SummaryIndex(SummaryIndex.path_for(filename))
+            store = self.history_store if keep_open else open_store(filename)
+            try:
+                if not summary.exists:
+                    # First save with a summary: build it from what's already stored
+                    summary.rebuild(store.records())
+                store.append(new, links=[self.product_link(r) for r in new])
+            finally:
+                if not keep_open:
+                    store.close()
+            summary.update(new)
+            summary.save()
         
-        print(f"\n💾 Saved {len(self.results)} results to {filename}")
+        replayed = len(self.results) - len(new)
+        print(f"\n💾 Saved {len(new)} results to {filename}" +
+              (f" ({replayed} from cached pages already saved)" if replayed else ""))
     
     def find_deals(self):
         """Find deals below threshold"""
-        deals = [r for r in self.results if r['price_per_oz'] <= self.price_threshold]
+        deals = [r for r in self.results if r.price_per_oz <= self.price_threshold]
         return deals
     
+    def load_trends(self):
+        """Price statistics over the full stored history (None if there is none)"""
+        if not os.path.exists(self.history_file):
+            return None
+        store = open_store(self.history_file)
+        try:
+            return PriceTrends(store.records())
+        finally:
+            store.close()
+    
+    def load_summary(self):
+        """Per-ASIN summary index saved next to the history (None if missing)"""
+        if self.summary_index is not None:
+            return self.summary_index if self.summary_index.exists else None
+        summary = SummaryIndex(SummaryIndex.path_for(self.history_file))
+        return summary if summary.exists else None
+    
+    def describe_history(self, asin, price_per_oz, summary=None, trends=None):
+        """How a price compares to the ASIN's history, read from the summary index"""
+        if summary is not None:
+            stats = summary.stats(asin)
+            if stats is None:
+                return None
+            return describe_price(stats, summary.percentile_rank(asin, price_per_oz), price_per_oz)
+        if trends is not None:
+            return trends.describe(asin, price_per_oz)
+        return None
+    
     def generate_report(self):
         """Generate markdown report"""
+        # The summary index keeps this independent of history size; only fall
+        # back to scanning the full history when there's no index yet
+        summary = self.load_summary()
+        trends = self.load_trends() if summary is None else None
         report = f"# Monster Energy Deal Report\n\n"
         report += f"**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n\n"
         report += f"**Price Threshold:** ${self.price_threshold:.3f}/fl oz\n\n"
@@ -408,46 +630,93 @@ class MonsterDealTracker:
         
         if deals:
             report += f"## 🎉 {len(deals)} Deal(s) Found Below ${self.price_threshold}/oz!\n\n"
-            for deal in sorted(deals, key=lambda x: x['price_per_oz']):
-                avail_status = deal.get('availability', 'Unknown')
+            for deal in sorted(deals, key=lambda x: x.price_per_oz):
+                avail_status = deal.availability or 'Unknown'
                 avail_emoji = "✅" if avail_status == "In Stock" else "⚠️"
-                seller = deal.get('seller_info', 'Unknown')
+                seller = deal.seller_info or 'Unknown'
                 
                 # Add warning for Subscribe & Save
                 if 'subscribe' in seller.lower() or 's&s' in seller.lower():
                     seller += " (requires subscription)"
                 
-                report += f"### {deal['title']}\n\n"
-                report += f"- **Retailer:** {deal['retailer']}\n"
+                report += f"### {deal.title}\n\n"
+                report += f"- **Retailer:** {deal.retailer}\n"
                 report += f"- **Availability:** {avail_emoji} {avail_status}\n"
                 report += f"- **Seller:** {seller}\n"
-                report += f"- **Price:** ${deal['price']:.2f} ({deal['fl_oz']:.0f} fl oz total)\n"
-                report += f"- **Price per fl oz:** ${deal['price_per_oz']:.4f} ⭐ **BELOW THRESHOLD**\n"
-                report += f"- **Link:** [{deal['asin']}]({deal['link']})\n"
-                report += f"- **Savings:** ${(self.price_threshold - deal['price_per_oz']) * deal['fl_oz']:.2f} vs threshold\n\n"
+                report += f"- **Price:** ${deal.price:.2f} ({deal.fl_oz:.0f} fl oz total)\n"
+                report += f"- **Price per fl oz:** ${deal.price_per_oz:.4f} ⭐ **BELOW THRESHOLD**\n"
+                history_note = self.describe_history(deal.asin, deal.price_per_oz, summary, trends)
+                if history_note:
+                    report += f"- **History:** {history_note}\n"
+                report += f"- **Link:** [{deal.asin}]({self.product_link(deal)})\n"
+                report += f"- **Savings:** ${(self.price_threshold - deal.price_per_oz) * deal.fl_oz:.2f} vs threshold\n\n"
         else:
             report += "## ℹ️ No deals found below threshold\n\n"
             if self.results:
                 report += f"Checked {len(self.results)} product(s). Best current prices:\n\n"
-                sorted_results = sorted(self.results, key=lambda x: x['price_per_oz'])[:5]
+                sorted_results = sorted(self.results, key=lambda x: x.price_per_oz)[:5]
                 for i, result in enumerate(sorted_results, 1):
-                    report += f"**#{i}. ${result['price_per_oz']:.4f}/fl oz** - {result['title'][:80]}\n"
-                    report += f"   - ${result['price']:.2f} for {result['fl_oz']:.0f} fl oz\n"
-                    report += f"   - [View on Amazon]({result['link']})\n\n"
+                    report += f"**#{i}. ${result.price_per_oz:.4f}/fl oz** - {result.title[:80]}\n"
+                    report += f"   - ${result.price:.2f} for {result.fl_oz:.0f} fl oz\n"
+                    history_note = self.describe_history(result.asin, result.price_per_oz, summary, trends)
+                    if history_note:
+                        report += f"   - History: {history_note}\n"
+                    report += f"   - [View on {result.retailer}]({self.product_link(result)})\n\n"
         
         return report
 
 def main():
-    tracker = MonsterDealTracker()
+    parser = argparse.ArgumentParser(description='Monster Energy deal tracker')
+    parser.add_argument('--history', default='price_history.json',
+                        help='price history file (.json, or .db for SQLite)')
+    parser.add_argument('--metrics', default='run_metrics.json',
+                        help='where to write this run\'s timing/metrics JSON')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='run under cProfile and write stats to PATH')
+    parser.add_argument('--retailers', nargs='+', choices=sorted(RETAILERS), default=['amazon'],
+                        help='retailers to check (crawled in parallel)')
+    parser.add_argument('--base-url', action='append', default=[], metavar='RETAILER=URL',
+                        help='point a retailer at another host, e.g. amazon=http://127.0.0.1:8000 '
+                             '(see bench/server.py)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running, re-checking each product on its own schedule')
+    parser.add_argument('--checks-per-hour', type=float, default=3,
+                        help='watch mode page fetches per retailer per hour')
+    parser.add_argument('--on-deal', metavar='COMMAND',
+                        help='watch mode: shell command run with the deal report on stdin')
+    args = parser.parse_args()
+    base_urls = dict(option.split('=', 1) for option in args.base_url if '=' in option)
+    if len(base_urls) != len(args.base_url) or not set(base_urls) <= set(RETAILERS):
+        parser.error('--base-url takes RETAILER=URL with one of: ' + ', '.join(sorted(RETAILERS)))
     
+    tracker = MonsterDealTracker(history_file=args.history,
+                                 retailers=[RETAILERS[key](base_url=base_urls.get(key)) for key in args.retailers])
+    if args.watch:
+        Watcher(tracker, checks_per_hour=args.checks_per_hour, metrics_path=args.metrics,
+                on_deal=args.on_deal).run()
+        return
+    try:
+        with profiled(args.profile):
+            run(tracker)
+    finally:
+        tracker.metrics.save(args.metrics)
+        print(f"\n⏱️  {tracker.metrics.summary()}")
+        print(f"📈 Metrics saved to {args.metrics}")
+
+def run(tracker):
     print("=" * 70)
     print("🔋 MONSTER ENERGY DEAL TRACKER")
     print("=" * 70)
     
-    tracker.check_amazon()
+    with tracker.metrics.stage('check'):
+        tracker.check_retailers()
+    tracker.close()
     
     if not tracker.results:
-        print("\n⚠️  No results found. Amazon may be blocking requests.")
+        if tracker.metrics.status != 'ok':
+            print(f"\n🛑 No results: {tracker.metrics.status}.")
+        else:
+            print("\n⚠️  No results found. The retailers may be blocking requests.")
         print("Try running again later or check your internet connection.")
         return
     
@@ -455,7 +724,8 @@ def main():
     tracker.save_results()
     
     # Generate report
-    report = tracker.generate_report()
+    with tracker.metrics.stage('report'):
+        report = tracker.generate_report()
     print("\n" + "=" * 70)
     print(report)
     print("=" * 70)
@@ -471,7 +741,7 @@ def main():
     if deals:
         print(f"\n🚨 ALERT: {len(deals)} deal(s) below ${tracker.price_threshold}/oz threshold!")
         for deal in deals:
-            print(f"   • ${deal['price_per_oz']:.4f}/oz - {deal['title'][:50]}...")
+            print(f"   • ${deal.price_per_oz:.4f}/oz - {deal.title[:50]}...")
     else:
         print(f"\n📊 No deals below threshold. Keep monitoring!")
 
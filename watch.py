@@ -0,0 +1,172 @@
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Watcher:
+    """Long-running watch mode around one warm MonsterDealTracker
+
+    Instead of checking everything twice a day from a cold start, each
+    product is re-checked when its own interval runs out (see
+    AsinCatalog.check_interval), within a per-retailer budget of page fetches
+    per hour. Promising products come round within minutes while the overall
+    request rate stays what the cron schedule used. New results are saved
+    after every batch; SIGTERM/SIGINT stop the loop after the current batch
+    and flush every cache to disk.
+    """
+    def __init__(self, tracker, checks_per_hour=3, shortest_interval=15 * 60, longest_interval=12 * 3600,
+                 discovery_interval=24 * 3600, block_cooldown=30 * 60, metrics_path=None, on_deal=None):
+        self.tracker = tracker
+        # A product comes round again well within its page's cache TTL, so
+        # every check asks the site (conditionally) instead of reusing the page
+        tracker.product_max_age = 0
+        self.checks_per_hour = checks_per_hour      # page fetches per retailer, search pages included
+        self.shortest_interval = shortest_interval  # seconds between checks of the hottest products
+        self.longest_interval = longest_interval    # ... and of the least promising ones
+        self.discovery_interval = discovery_interval
+        self.block_cooldown = block_cooldown        # pause after a retailer's circuit breaker trips
+        self.search_pages = 3
+        self.metrics_path = metrics_path
+        self.on_deal = on_deal                      # shell command, gets the deal report on stdin
+        self.stopping = threading.Event()
+
+        # Budget: a token bucket per retailer, holding 15 minutes of checks
+        # (and at least enough for a search crawl)
+        self.burst = max(float(self.search_pages), checks_per_hour / 4)
+        now = time.monotonic()
+        self.allowance = {adapter.key: self.burst for adapter in tracker.retailers}
+        self.refilled = {adapter.key: now for adapter in tracker.retailers}
+        # Known catalogs wait a full interval before the first re-discovery
+        self.last_discovery = {adapter.key: now for adapter in tracker.retailers
+                               if tracker.catalogs[adapter.key].products}
+        self.alerted = {}  # asin -> $/oz we last alerted on
+
+    def stop(self, signum=None, frame=None):
+        if not self.stopping.is_set():
+            print("\n🛑 Stopping after the current batch...")
+        self.stopping.set()
+
+    def refill(self, key):
+        now = time.monotonic()
+        elapsed = now - self.refilled[key]
+        self.refilled[key] = now
+        self.allowance[key] = min(self.burst, self.allowance[key] + elapsed * self.checks_per_hour / 3600)
+
+    def check_retailer(self, adapter):
+        """One scheduling pass for a retailer: re-discover if due, then check due products"""
+        tracker = self.tracker
+        key = adapter.key
+        fetcher = tracker.fetchers[key]
+        catalog = tracker.catalogs[key]
+        self.refill(key)
+
+        if fetcher.breaker.open:
+            if time.monotonic() - fetcher.breaker.opened_at < self.block_cooldown:
+                return []
+            print(f"\n🔁 {adapter.name}: block cooldown over, trying again")
+            fetcher.breaker.reset()
+
+        last = self.last_discovery.get(key)
+        if (last is None or time.monotonic() - last >= self.discovery_interval) and self.allowance[key] >= self.search_pages:
+            self.allowance[key] -= self.search_pages
+            found = tracker.search(adapter, max_pages=self.search_pages)
+            new = catalog.add_discovered(found, tracker.search_cards[key])
+            self.last_discovery[key] = time.monotonic()
+            print(f"  📇 {new} new {adapter.name} product(s) added to the catalog")
+
+        batch = int(self.allowance[key])
+        due = catalog.due(tracker.price_threshold, self.shortest_interval, self.longest_interval)
+        due = tracker.prescreen(adapter, due)[:batch]
+        if not due:
+            return []
+        self.allowance[key] -= len(due)
+        results = tracker.check_products(adapter, due, limit=len(due), debug_first=0)
+        catalog.save()
+        tracker.pack_sizes[key].save()
+        return results
+
+    def next_wake(self):
+        """Seconds until some retailer has a product due and budget to check it"""
+        tracker = self.tracker
+        wait = self.shortest_interval
+        for adapter in tracker.retailers:
+            key = adapter.key
+            fetcher = tracker.fetchers[key]
+            if fetcher.breaker.open:
+                wait = min(wait, self.block_cooldown - (time.monotonic() - fetcher.breaker.opened_at))
+                continue
+            due_in = tracker.catalogs[key].next_due(tracker.price_threshold, self.shortest_interval, self.longest_interval)
+            budget_in = max(1 - self.allowance[key], 0.0) * 3600 / self.checks_per_hour
+            wait = min(wait, max(due_in, budget_in))
+        return max(wait, 1.0)
+
+    def save(self, results):
+        """Append a batch to the history and alert on deals we haven't alerted on yet"""
+        tracker = self.tracker
+        tracker.results = results
+        tracker.save_results()
+
+        fresh = []
+        for result in results:
+            if result.price_per_oz <= tracker.price_threshold:
+                if self.alerted.get(result.asin) != result.price_per_oz:
+                    fresh.append(result)
+                self.alerted[result.asin] = result.price_per_oz
+            else:
+                self.alerted.pop(result.asin, None)
+        if not fresh:
+            return
+
+        report = tracker.generate_report()
+        with open('deal_report.md', 'w', encoding='utf-8') as f:
+            f.write(report)
+        print(f"\n🚨 ALERT: {len(fresh)} new deal(s) below ${tracker.price_threshold}/oz threshold!")
+        for deal in fresh:
+            print(f"   • ${deal.price_per_oz:.4f}/oz - {deal.title[:50]}...")
+        if self.on_deal:
+            subprocess.run(self.on_deal, shell=True, input=report, text=True)
+
+    def flush(self):
+        """Write every in-memory cache and the metrics to disk"""
+        tracker = self.tracker
+        for adapter in tracker.retailers:
+            tracker.catalogs[adapter.key].save()
+            tracker.pack_sizes[adapter.key].save()
+        if tracker.captures is not None:
+            tracker.captures.prune()
+        tracker.http_cache.save()
+        if self.metrics_path:
+            tracker.metrics.save(self.metrics_path)
+
+    def run(self):
+        tracker = self.tracker
+        tracker.keep_history_open()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"👀 Watching {', '.join(adapter.name for adapter in tracker.retailers)} "
+              f"({self.checks_per_hour} checks/hour per retailer, Ctrl+C or SIGTERM to stop)")
+
+        for adapter in tracker.retailers:
+            catalog = tracker.catalogs[adapter.key]
+            catalog.start_run()
+            if not catalog.products:
+                store = tracker.history_store
+                catalog.seed_from_history(r for r in store.records() if r.retailer == adapter.name)
+        tracker.start_parse_pool()
+        executor = ThreadPoolExecutor(max_workers=len(tracker.retailers))
+        try:
+            while not self.stopping.is_set():
+                batches = list(executor.map(self.check_retailer, tracker.retailers))
+                results = [result for batch in batches for result in batch]
+                if results:
+                    self.save(results)
+                    self.flush()
+                self.stopping.wait(self.next_wake())
+        finally:
+            executor.shutdown(wait=True)
+            tracker.stop_parse_pool()
+            self.flush()
+            tracker.close()
+            print("👋 Watch mode stopped, state saved")